@@ -2,14 +2,15 @@ import os
 import healpy as hp
 import numpy as np
 import matplotlib.pyplot as plt
-from leviathan.engines import voids
-from leviathan.validation import nulling
+from leviathan.engines import minkowski, voids
+from leviathan.validation import nulling, pseudo_cl
 
 # --- CONFIG ---
 PLANCK_PATH = "data/raw/planck/smica.fits"
 # Coordinates for the Eridanus Center
 COLD_SPOT_COORDS = (209.3, -57.4) # Galactic Longitude/Latitude
 VOID_RADIUS = 5.0 # Degrees
+MF_NSIDE = 256 # Resolution of the Minkowski functional test
 
 def run_void_audit():
     print("Leviathan Phase III: The Masked Void Audit")
@@ -29,15 +30,22 @@ def run_void_audit():
     # 2. Measure the Spot in the Real Map
     t_obs, t_std = voids.get_void_profile(full_map * mask, *COLD_SPOT_COORDS, VOID_RADIUS)
     print(f"-> Observed Temp Anomaly: {t_obs*1e6:.2f} uK")
+    # Observed and null maps are masked then degraded identically; only
+    # low-resolution pixels that are entirely unmasked enter the functionals
+    mf_mask = (hp.ud_grade(mask, MF_NSIDE) == 1).astype(float)
+    mf_obs = minkowski.minkowski_functionals(hp.ud_grade(full_map * mask, MF_NSIDE), mask=mf_mask)
 
     # 3. Statistical Comparison
     print(f"-> Generating 100 Masked Nulls...")
+    cls = pseudo_cl.PseudoCl.for_mask(mask, 512).spectrum(full_map)
     null_results = []
+    mf_nulls = []
     for i in range(100):
         # Use our new masked-aware generator
-        n_map = nulling.generate_masked_null(full_map, mask)
+        n_map = nulling.generate_masked_null(full_map, mask, cls=cls)
         t_null, _ = voids.get_void_profile(n_map, *COLD_SPOT_COORDS, VOID_RADIUS)
         null_results.append(t_null)
+        mf_nulls.append(hp.ud_grade(n_map, MF_NSIDE)) # n_map is already null * mask
         if (i+1) % 20 == 0: print(f"   Progress: {i+1}/100")
 
     # 4. Results
@@ -47,6 +55,11 @@ def run_void_audit():
     
     print("\n--- RESULTS ---")
     print(f"   Significance: {abs(sig):.2f} sigma")
+
+    # Topology of the whole masked sky (area, boundary, genus at all thresholds)
+    mf_null = minkowski.null_functionals(np.array(mf_nulls), mask=mf_mask)
+    chi2, p_mf = minkowski.chi2_against_nulls(mf_obs, mf_null)
+    print(f"   Minkowski functionals: chi2 = {chi2:.1f} ({3 * len(mf_obs['thresholds'])} values), p = {p_mf:.3f}")
     
     # 5. The Leviathan Curve: Density vs. Temperature
     # In a PbC universe, a void of this temperature implies a density drop 
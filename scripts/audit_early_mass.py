@@ -1,3 +1,4 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -20,7 +21,7 @@ def run_audit():
     print("----------------------------------------")
     
     z_vals = np.linspace(5, 20, 100)
-    t_lcdm = [chronometry.get_coord_age(z) for z in z_vals]
+    t_lcdm = chronometry.get_coord_age(z_vals)
     
     # 1. Plot the LambdaCDM Hard Limit (t)
     plt.figure(figsize=(10, 6))
@@ -36,7 +37,7 @@ def run_audit():
     # 3. Fit the Leviathan Curve (Find best alpha)
     # We want a curve that encompasses these points
     best_alpha = 0.35 # Hypothesis guess
-    t_leviathan = [chronometry.get_structural_age(z, alpha=best_alpha) for z in z_vals]
+    t_leviathan = chronometry.get_structural_age(z_vals, alpha=best_alpha)
     
     plt.plot(z_vals, t_leviathan, 'b-', linewidth=3, alpha=0.8, 
              label=f'Leviathan Hypothesis ($\\alpha={best_alpha}$)')
@@ -57,8 +58,8 @@ def run_audit():
 
     # 4. Report Tension
     print("\nAnomaly Report:")
-    for d in dataset:
-        limit = chronometry.get_coord_age(d['z'])
+    limits = chronometry.get_coord_age(np.array(zs))
+    for d, limit in zip(dataset, limits):
         excess = d['obs_age_struct'] / limit
         print(f"Object {d['id']} (z={d['z']}):")
         print(f"  - Coordinate Limit: {limit:.3f} Gyr")
@@ -1,36 +1,35 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from astropy.table import Table, join
 from astropy.coordinates import SkyCoord
 from astropy import units as u
 from astropy.cosmology import Planck18
 from scipy.spatial import cKDTree
 import networkx as nx
 import os
+from leviathan import euclid
+from leviathan.engines import photoz
 
 # 1. SETUP
-MER_PATH = 'data/raw/euclid/EUC_MER_FINAL-CAT_TILE102018212.fits' # RA/DEC
-PHZ_PATH = 'data/raw/euclid/EUC_PHZ_PHYSPARAM_TILE102018212.fits' # Redshifts
+TILES = [102018212] # MER (RA/DEC) + PHZ (redshifts) are streamed tile by tile
+Z_RANGE = (3.0, 6.0)
 OUTPUT_DIR = 'paper/figures'
+N_REALISATIONS = 100 # Photo-z draws per object
+INTERVAL_COLUMNS = ('PHZ_PP_68_REDSHIFT', 'PHZ_70_INT') # (lo, hi) per object, if present
+PDF_COLUMN = 'PHZ_PDF'
+PDF_GRID = np.linspace(0.0, 6.0, 601)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 def audit_connectivity():
-    print(f"-> Loading Catalogs...")
-    mer = Table.read(MER_PATH)
-    phz = Table.read(PHZ_PATH)
+    # 2-3. LOAD, JOIN AND FILTER FOR THE DESERT
+    # Only the needed columns are read; the redshift cut is applied while
+    # reading PHZ and positions are joined on OBJECT_ID afterwards
+    print(f"-> Loading Catalogs ({len(TILES)} tiles)...")
+    z_col = euclid.Z_COLUMN
+    desert = euclid.load_tiles(TILES, z_range=Z_RANGE, optional=INTERVAL_COLUMNS + (PDF_COLUMN,))
+    n_desert = len(desert[z_col]) if desert else 0
+    print(f"-> Desert Candidates ({Z_RANGE[0]:g} < z < {Z_RANGE[1]:g}): {n_desert}")
     
-    # 2. JOIN
-    print(f"-> Joining Position (N={len(mer)}) + Redshift (N={len(phz)})...")
-    data = join(mer, phz, keys='OBJECT_ID', join_type='inner')
-    print(f"-> Joined Catalog: {len(data)} objects.")
-    
-    # 3. FILTER FOR THE DESERT
-    z_col = 'PHZ_PP_MEDIAN_REDSHIFT'
-    mask = (data[z_col] > 3.0) & (data[z_col] < 6.0)
-    desert = data[mask]
-    print(f"-> Desert Candidates (3 < z < 6): {len(desert)}")
-    
-    if len(desert) < 100:
+    if n_desert < 100:
         print("Not enough candidates for clustering analysis.")
         return
 
@@ -59,7 +58,7 @@ def audit_connectivity():
     pairs = tree.query_pairs(linking_length)
     
     G = nx.Graph()
-    G.add_nodes_from(range(len(desert)))
+    G.add_nodes_from(range(n_desert))
     G.add_edges_from(pairs)
     
     components = list(nx.connected_components(G))
@@ -81,6 +80,23 @@ def audit_connectivity():
         print("Structure Diameter: N/A (Single Node)")
         diameter = 0
 
+    # 5b. PHOTO-Z ENSEMBLE (the median redshift alone ignores the line-of-sight scatter)
+    print(f"-> Propagating photo-z errors ({N_REALISATIONS} realisations)...")
+    kwargs = {}
+    interval = [c for c in INTERVAL_COLUMNS if c in desert]
+    if PDF_COLUMN in desert:
+        kwargs = {'pdf': np.array(desert[PDF_COLUMN]), 'pdf_z': PDF_GRID}
+    elif interval:
+        bounds = np.array(desert[interval[0]])
+        kwargs = {'z_lo': bounds[:, 0], 'z_hi': bounds[:, 1]}
+    else:
+        print(f"   No PHZ error columns; assuming sigma_z = {photoz.SIGMA_DEFAULT}(1+z).")
+    ensemble = photoz.PhotozEnsemble(ra_vals, dec_vals, z_vals, linking_length, z_range=Z_RANGE, **kwargs)
+    pz = ensemble.run(N_REALISATIONS, seed=0)
+    lo, med, hi = pz['diameter_quantiles']
+    print(f"Structure Diameter (photo-z ensemble): {med:.1f} (+{hi - med:.1f} / -{med - lo:.1f}) Mpc")
+    print(f"Objects with P(largest) > 0.5: {np.sum(pz['p_largest'] > 0.5)}")
+
     # 6. VISUALIZATION
     plt.figure(figsize=(10,10))
     plt.style.use('dark_background')
@@ -89,7 +105,7 @@ def audit_connectivity():
     plt.scatter(xyz[:,0], xyz[:,1], s=1, c='gray', alpha=0.3, label='Background (Desert)')
     plt.scatter(cluster_xyz[:,0], cluster_xyz[:,1], s=30, c='cyan', label=f'Giant Component ({diameter:.0f} Mpc)')
     
-    plt.title(f"Euclid 'Desert' Scaffolding (z=3-6)\nN={len(desert)} | Max Dia: {diameter:.1f} Mpc")
+    plt.title(f"Euclid 'Desert' Scaffolding (z=3-6)\nN={n_desert} | Max Dia: {diameter:.1f} Mpc")
     plt.xlabel("Comoving X [Mpc]")
     plt.ylabel("Comoving Y [Mpc]")
     plt.legend()
@@ -1,68 +1,84 @@
-import boto3
 import os
+import json
+import hashlib
 import numpy as np
 import matplotlib.pyplot as plt
-from astropy.table import Table
-from botocore import UNSIGNED
-from botocore.client import Config
+from astropy.io import fits
+from leviathan import accumulators, config, euclid, pipeline
 
 # 1. SETUP
-BUCKET_NAME = 'nasa-irsa-euclid-q1'
-REGION = 'us-east-1'
-# The 33MB Physical Parameters Catalog (General Galaxies)
-TARGET_KEY = 'q1/catalogs/PHZ_PF_OUTPUT_FOR_L3/102018212/EUC_PHZ_PHYSPARAM__20241119T224622.918962Z_00.00.fits'
-LOCAL_PATH = 'data/raw/euclid/EUC_PHZ_PHYSPARAM_TILE102018212.fits'
+# The 33MB Physical Parameters Catalog (General Galaxies); add tiles to
+# accumulate survey-wide n(z) in one streaming pass
+TILES = [102018212]
+Z_EDGES = np.linspace(0.0, 10.0, 101)
+Z_RANGES = {'valid': (0.0, 10.0), 'desert': (3.0, 6.0)}
+# In L3 products, the redshift is often 'PHZ_Z' or 'PHZ_PP_MEDIAN_REDSHIFT'
+Z_CANDIDATES = ['PHZ_Z', 'PHZ_PP_MEDIAN_REDSHIFT', 'Z_MEAN', 'Z_BEST']
 
-os.makedirs('data/raw/euclid', exist_ok=True)
 os.makedirs('paper/figures', exist_ok=True)
 
-def audit_euclid_redshifts():
-    # 2. DOWNLOAD
-    if not os.path.exists(LOCAL_PATH):
-        print(f"-> Downloading Euclid PHZ Catalog ({33} MB)...")
-        s3 = boto3.client('s3', region_name=REGION, config=Config(signature_version=UNSIGNED))
-        s3.download_file(BUCKET_NAME, TARGET_KEY, LOCAL_PATH)
-        print("-> Download Complete.")
-    else:
-        print("-> File already exists. Skipping download.")
+def summary_key():
+    """Hash of the binning and column choice (stale caches never match)."""
+    spec = {'edges': Z_EDGES.tolist(), 'ranges': Z_RANGES, 'z_candidates': Z_CANDIDATES}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
 
-    # 3. INSPECT WITH ASTROPY
-    print("-> Opening PHZ Catalog...")
-    dat = Table.read(LOCAL_PATH)
-    
-    # 4. IDENTIFY REDSHIFT COLUMN
-    # In L3 products, this is often 'PHZ_Z' or 'PHZ_PP_MEDIAN_REDSHIFT'
-    z_col = None
-    candidates = ['PHZ_Z', 'PHZ_PP_MEDIAN_REDSHIFT', 'Z_MEAN', 'Z_BEST']
-    
-    print(f"-> Searching for redshift column...")
-    for col in dat.colnames:
-        if col in candidates:
-            z_col = col
-            break
-            
-    if z_col:
-        print(f"-> Using Redshift Column: {z_col}")
-        zs = dat[z_col]
-        
-        # 5. FILTER & AUDIT
+def tile_redshift_summary(tile_id):
+    """Streaming n(z) accumulators of one tile (cached per tile and binning)."""
+    cache = os.path.join(config.CACHE_DIR, f"euclid_phz_nz_{tile_id}_{summary_key()}.json")
+    if os.path.exists(cache):
+        return accumulators.load(cache)
+
+    # 2. DOWNLOAD (mirrored; skipped when already present and verified)
+    local_path = euclid.fetch_tile(tile_id, 'PHZ')
+    print(f"-> PHZ catalogue for tile {tile_id} available at {local_path}")
+
+    # 3. IDENTIFY REDSHIFT COLUMN
+    with fits.open(local_path, memmap=True) as hdul:
+        colnames = hdul[1].columns.names
+    z_col = next((col for col in colnames if col in Z_CANDIDATES), None)
+    if z_col is None:
+        print("-> WARNING: Could not find Redshift Column.")
+        print(f"Columns: {colnames[:20]}")
+        return None
+    print(f"-> Using Redshift Column: {z_col}")
+
+    # 4. STREAM THE COLUMN (only z is read, block by block)
+    summary = {
+        'nz': accumulators.Histogram(Z_EDGES),
+        'ranges': accumulators.RangeCounts(Z_RANGES),
+        'quantiles': accumulators.QuantileSketch(),
+    }
+    for block in pipeline.pipeline(pipeline.row_blocks(local_path, [z_col])):
+        zs = block[z_col]
         # Filter 1: Valid Redshifts
-        mask = (zs > 0) & (zs < 10) 
-        valid_zs = zs[mask]
-        
+        valid_zs = zs[(zs > 0) & (zs < 10)]
+        summary['nz'].update(valid_zs)
+        summary['quantiles'].update(valid_zs)
+        summary['ranges'].update(zs)
+    accumulators.save(summary, cache)
+    return summary
+
+def audit_euclid_redshifts():
+    summaries = [s for s in map(tile_redshift_summary, TILES) if s is not None]
+    if summaries:
+        # 5. MERGE & AUDIT
+        summary = accumulators.merge(summaries)
+        nz, ranges = summary['nz'], summary['ranges']
+
         # Filter 2: The Redshift Desert
-        desert_mask = (valid_zs > 3.0) & (valid_zs < 6.0)
-        desert_count = np.sum(desert_mask)
-        total_count = len(valid_zs)
-        
-        print(f"\n--- REDSHIFT AUDIT (Tile 102018212) ---")
+        desert_count = ranges.counts['desert']
+        total_count = ranges.counts['valid']
+        label = f"Tile {TILES[0]}" if len(TILES) == 1 else f"{len(summaries)} tiles"
+
+        print(f"\n--- REDSHIFT AUDIT ({label}) ---")
         print(f"Total Valid Objects: {total_count}")
         print(f"Redshift Desert Candidates (3 < z < 6): {desert_count}")
-        print(f"Desert Fraction: {desert_count/total_count*100:.2f}%")
+        print(f"Desert Fraction: {ranges.fraction('desert', of='valid')*100:.2f}%")
+        print(f"Median z: {summary['quantiles'].quantile(0.5):.3f}")
         
         # 6. PLOT
         plt.figure(figsize=(10,6))
-        plt.hist(valid_zs, bins=100, color='indigo', alpha=0.7, label='Euclid Q1 Photo-Z')
+        plt.stairs(nz.counts, nz.edges, fill=True, color='indigo', alpha=0.7, label='Euclid Q1 Photo-Z')
         
         # Highlight the Desert
         plt.axvspan(3, 6, color='orange', alpha=0.3, label='The Desert (z=3-6)')
@@ -73,17 +89,13 @@ def audit_euclid_redshifts():
         
         plt.xlabel('Redshift (z)')
         plt.ylabel('Count')
-        plt.title(f'Euclid Deep Field South (Tile 102018212)\nGap Analysis: {desert_count} Candidates Found')
+        plt.title(f'Euclid Deep Field South ({label})\nGap Analysis: {desert_count} Candidates Found')
         plt.legend()
         plt.grid(True, alpha=0.2)
         
         outfile = 'paper/figures/euclid_q1_redshift_check.png'
         plt.savefig(outfile)
         print(f"-> Histogram saved to {outfile}")
-        
-    else:
-        print("-> WARNING: Could not find Redshift Column.")
-        print(f"Columns: {dat.colnames[:20]}")
 
 if __name__ == "__main__":
     audit_euclid_redshifts()
@@ -1,7 +1,7 @@
-import numpy as np
 import matplotlib.pyplot as plt
 from leviathan import ingestion
 from leviathan.engines import topology
+from leviathan.validation import randoms
 import os
 
 # --- CONFIG ---
@@ -10,22 +10,15 @@ DATA_PATH = "data/raw/desi/zpix-main-dark.fits"
 # Change Line 9 to this lower range:
 LINKING_STEPS = [30, 40, 50, 60] # Mpc
 
-def shuffle_universe(positions):
+def shuffle_universe(positions, redshifts, seed=None):
     """
-    Creates a null universe by shuffling RA/DEC/Z independently.
-    This preserves the n(z) curve but destroys all structure.
+    Creates a null universe with the same footprint and n(z) as the data.
+    Directions are drawn uniformly inside the occupied HEALPix pixels and
+    redshifts from the observed n(z), destroying all clustering.
     """
-    n = len(positions)
-    # Convert back to spherical to shuffle properly? 
-    # Actually, simpler: just shuffle the X, Y, Z columns independently.
-    # This destroys angular correlations.
-    x = positions[:,0].copy()
-    y = positions[:,1].copy()
-    z = positions[:,2].copy()
-    np.random.shuffle(x)
-    np.random.shuffle(y)
-    np.random.shuffle(z)
-    return np.column_stack((x, y, z))
+    generator = randoms.RandomCatalogue.from_positions(positions, redshifts, seed=seed)
+    null_positions, _ = generator.sample(len(positions))
+    return null_positions
 
 def run_sweep():
     print("Leviathan Phase II-B: The Percolation Audit")
@@ -38,6 +31,7 @@ def run_sweep():
     # Filter for Cosmic Noon
     mask = (z_real > 1.5) & (z_real < 2.5)
     sample_real = pos_real[mask]
+    z_sample = z_real[mask]
     
     # Downsample for speed if needed (DESI is huge)
     # Let's take a random 10% if it's too slow, but for 700k points, 
@@ -46,7 +40,7 @@ def run_sweep():
     
     # 2. Generate Null Data
     print("-> Generating Randomized Control...")
-    sample_null = shuffle_universe(sample_real)
+    sample_null = shuffle_universe(sample_real, z_sample)
 
     results_real = []
     results_null = []
@@ -0,0 +1,50 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+from leviathan.engines import causal_tree
+
+os.makedirs('paper/figures', exist_ok=True)
+
+# 1. THE CLAIM
+# A retro-selective tree branching into k ~ 3.5 possibilities per step builds
+# a teleological bias A(t) ~ t ln k, with ln k = 1.26 the observed exponent.
+TARGET_LN_K = 1.26
+K_GRID = np.array([1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0, 6.0])
+DEPTH = 64
+N_SEEDS = 64
+SEED = 42
+
+# 2. SIMULATE
+# beam = 1: the best child is kept at every step (myopic selection).
+# beam = 512: the Present selects the best complete history (retro-selection).
+print("-> Growing causal trees...")
+scans = {}
+for label, beam in (('myopic', 1), ('retro', causal_tree.BEAM)):
+    scans[label] = causal_tree.bias_scan(K_GRID, depth=DEPTH, beam=beam, n_seeds=N_SEEDS, seed=SEED)
+
+print("\n--- TELEOLOGICAL BIAS PER LEVEL ---")
+print(f"{'k':<5} | {'ln k':<6} | {'myopic':<15} | {'retro':<15}")
+print("-" * 50)
+for i, k in enumerate(K_GRID):
+    m, r = scans['myopic'], scans['retro']
+    print(f"{k:<5.1f} | {np.log(k):<6.3f} | {m['slope'][i]:.3f} +/- {m['slope_err'][i]:.3f} | "
+          f"{r['slope'][i]:.3f} +/- {r['slope_err'][i]:.3f}")
+
+# 3. WHICH k GIVES A SLOPE OF 1.26?
+for label, scan in scans.items():
+    k_hit = np.interp(TARGET_LN_K, scan['slope'], scan['k'], left=np.nan, right=np.nan)
+    print(f"{label:<6}: slope {TARGET_LN_K} at k = {k_hit:.2f} (theory: k = {np.exp(TARGET_LN_K):.2f})")
+
+# 4. PLOT
+plt.figure(figsize=(10, 6))
+plt.plot(K_GRID, np.log(K_GRID), 'k--', label=r'Theory: $\ln k$')
+for (label, scan), color in zip(scans.items(), ('b', 'r')):
+    plt.errorbar(K_GRID, scan['slope'], yerr=scan['slope_err'], fmt=f'{color}o-', label=f'Simulated ({label})')
+plt.axhline(TARGET_LN_K, color='gray', alpha=0.5, label=r'Observed $\alpha = 1.26$')
+plt.xlabel('Branching Factor (k)')
+plt.ylabel(r'Bias per Level $dA/dt$')
+plt.title('Retro-Selective Causal Tree')
+plt.legend()
+plt.grid(True, alpha=0.3)
+plt.savefig('paper/figures/causal_tree_bias.png')
+print("-> Figure saved.")
@@ -1,95 +1,55 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.integrate import odeint
-from scipy.interpolate import interp1d
+from leviathan.engines import growth
 
 # 1. COSMOLOGY SETUP (Planck 2018)
-H0 = 67.4 # km/s/Mpc
-Om = 0.315
-Ol = 0.685
-H0_inv_Gyr = 1 / (H0 * 0.001022) # Time unit conversion
-
-# Friedmann Equations
-def E(z):
-    return np.sqrt(Om * (1+z)**3 + Ol)
-
-def Hubble(z):
-    return H0 * 0.001022 * E(z) # in Gyr^-1
-
-def Omega_m(z):
-    return Om * (1+z)**3 / E(z)**2
-
-def growth_rate_f(z):
-    # Approximation f = Omega_m(z)^0.55
-    return Omega_m(z)**0.55
-
-# Time-Redshift Relation: dt = -dz / ((1+z)H(z))
-def dz_dt(z):
-    return -(1+z) * Hubble(z)
-
-# 2. VARIANCE EVOLUTION (dV/dz)
-# We solve in z-space because it's easier, but physics is in t-space.
-# dV/dt = 2*f*H*V + 2*D
-# dV/dz = (dV/dt) * (dt/dz) = (2*f*H*V + 2*D) / (- (1+z)H)
-#       = - (2*f*V)/(1+z) - (2*D)/((1+z)H)
-
-def variance_deriv(V, z, D0, k):
-    # V: Current Variance
-    # z: Current Redshift
-    
-    # Physics parameters
-    H = Hubble(z)
-    f = growth_rate_f(z)
-    
-    # Diffusion Model: D(z) ~ (1+z)^k
-    # Dimensional check: D must be [Variance / Time]
-    Diffusion = D0 * ((1+z)**k)
-    
-    # The Equation
-    term1 = -(2 * f * V) / (1 + z)
-    term2 = -(2 * Diffusion) / ((1 + z) * H)
-    
-    return term1 + term2
-
-# 3. SOLVE FOR STANDARD vs STOCHASTIC
-z_start = 100.0
-z_end = 0.0
-z_grid = np.linspace(z_start, z_end, 1000)
+# Background, growth rate f = Omega_m(z)^0.55 and the variance equation
+#   dV/dz = - (2*f*V)/(1+z) - (2*D)/((1+z)H),  D = D0 (1+z)^k
+# live in leviathan.engines.growth, which solves it by quadrature (the
+# equation is linear in V) for whole parameter grids at once.
 
+# 2. THE TUNED MODEL
 # Initial Condition: Small primordial variance (e.g., 1e-5)
 V0 = 1e-5
-
-# A. Standard Model (D=0) -> Pure Gravity
-V_std = odeint(variance_deriv, V0, z_grid, args=(0.0, 0.0)).flatten()
-
-# B. Leviathan Model (D ~ Density ~ z^3)
-# We tune D0 (Amplitude) and k (Exponent)
 k_test = 3.0 # The Density Hypothesis
 D0_test = 1e-5 # Amplitude factor (tuned to match z=10 magnitude)
 
-V_stoch = odeint(variance_deriv, V0, z_grid, args=(D0_test, k_test)).flatten()
-
-# 4. CALCULATE RUSHING FACTOR
+# 3. SOLVE FOR STANDARD vs STOCHASTIC
 # R = sqrt(V_stoch) / sqrt(V_std) (Amplitude Ratio)
-# Avoid division by zero at high z where V is tiny
-R = np.sqrt(V_stoch) / np.sqrt(V_std)
-
-# 5. CHECK THE SCALING EXPONENT
-# Fit R vs (1+z) to find alpha
-# We focus on the observable range z=0 to z=10
-mask = (z_grid < 10.0) & (z_grid > 0.1)
-z_fit = z_grid[mask]
-R_fit = R[mask]
+sol = growth.solve_variance(D0_test, k_test, V0)
+z_grid, R = sol['z'], sol['R']
 
-# Power Law Fit: R = A * (1+z)^alpha
-fit_params = np.polyfit(np.log(1+z_fit), np.log(R_fit), 1)
-alpha_derived = fit_params[0]
+# 4. CHECK THE SCALING EXPONENT
+# Power Law Fit: R = A * (1+z)^alpha over the observable range z=0.1 to z=10
+alpha_derived, _ = growth.fit_alpha(z_grid, R)
 
 print("\n--- ANALYTIC DERIVATION RESULTS ---")
 print(f"Input Diffusion Scaling (k): {k_test} (Matter Density)")
 print(f"Derived Anomaly Scaling (alpha): {alpha_derived:.3f}")
 print(f"Observed Target: 1.26")
 
+# 5. MODEL LANDSCAPE
+# alpha for every (V0, D0, k) in one call, and the k that reproduces the target
+D0_GRID = np.logspace(-8, -2, 61)
+K_GRID = np.linspace(0.0, 6.0, 121)
+V0_GRID = np.array([1e-6, 1e-5, 1e-4])
+TARGET_ALPHA = 1.26
+
+landscape = growth.variance_landscape(D0_GRID, K_GRID, V0_GRID, target=TARGET_ALPHA)
+alpha = landscape['alpha']
+
+print("\n--- MODEL LANDSCAPE ---")
+print(f"Grid: {len(V0_GRID)} V0 x {len(D0_GRID)} D0 x {len(K_GRID)} k")
+print(f"Alpha range on grid: [{alpha.min():.3f}, {alpha.max():.3f}]")
+n_hit = int(np.sum(np.isfinite(landscape['k_target'])))
+print(f"(V0, D0) pairs reaching alpha={TARGET_ALPHA}: {n_hit} / {landscape['k_target'].size}")
+print(f"{'V0':<8} | {'D0':<10} | {'k(alpha=1.26)':<14} | {'d alpha/dk':<10} | {'closest k':<9}")
+print("-" * 62)
+for i, v0 in enumerate(V0_GRID):
+    for j in range(0, len(D0_GRID), 20):
+        print(f"{v0:<8.0e} | {D0_GRID[j]:<10.1e} | {landscape['k_target'][i, j]:<14.3f} | "
+              f"{landscape['dalpha_dk'][i, j]:<10.3f} | {landscape['k_closest'][i, j]:<9.2f}")
+
 # 6. GENERATE THE TABLE AND PLOT
 print("\n--- DIMENSIONAL CHECK & DATA TABLE ---")
 print(f"{'z':<6} | {'rho_m (scaled)':<15} | {'D(z)':<15} | {'R(z)':<10}")
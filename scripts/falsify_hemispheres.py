@@ -1,40 +1,14 @@
+import os
 import numpy as np
+import healpy as hp
 from astropy.io import fits
-from astropy.cosmology import Planck18
-from astropy.coordinates import SkyCoord
-from scipy.spatial import cKDTree
-import networkx as nx
-import astropy.units as u
+from leviathan import config, ingestion
+from leviathan.validation import hemispheres, randoms, resampling, significance
 
-# 1. LOAD DATA
-fits_path = 'data/raw/desi/zpix-main-dark.fits'
-print(f"-> Loading DESI Catalog: {fits_path}...")
-with fits.open(fits_path, memmap=True) as hdul:
-    data = hdul[1].data
-    # Filter for Quasars (SPECTYPE='QSO') and Z > 0
-    mask = (data['SPECTYPE'] == 'QSO') & (data['Z'] > 0.0)
-    qsos = data[mask]
+LINKING_LENGTH = 150.0 # Mpc
+SEED = 2024
 
-print(f"-> Total Quasars: {len(qsos)}")
-
-# 2. SPLIT HEMISPHERES
-# Standard Definition: NGC (North) vs SGC (South) usually split by Galactic Plane
-# For RA approximation: NGC is roughly 100 < RA < 300, SGC is the rest
-ra = qsos['TARGET_RA']
-dec = qsos['TARGET_DEC']
-z = qsos['Z']
-
-# Simple RA split for speed (approximate NGC/SGC)
-mask_north = (ra > 80) & (ra < 300)
-mask_south = ~mask_north
-
-north_set = {'ra': ra[mask_north], 'dec': dec[mask_north], 'z': z[mask_north]}
-south_set = {'ra': ra[mask_south], 'dec': dec[mask_south], 'z': z[mask_south]}
-
-print(f"-> North Sample: {len(north_set['ra'])}")
-print(f"-> South Sample: {len(south_set['ra'])}")
-
-# 3. ANALYSIS FUNCTION
+# ANALYSIS FUNCTION
 def analyze_hemisphere(name, sample):
     print(f"\n--- ANALYZING {name} ---")
     
@@ -51,62 +25,93 @@ def analyze_hemisphere(name, sample):
 
     # Convert to 3D
     print("-> Converting to Cartesian...")
-    # Strip units to avoid deg2 errors
-    ra_np = np.array(ra_sub)
-    dec_np = np.array(dec_sub)
-    dist = Planck18.comoving_distance(z_sub).value
+    xyz = ingestion.radec_to_cartesian(np.array(ra_sub), np.array(dec_sub), np.array(z_sub))
     
-    c = SkyCoord(ra=ra_np*u.deg, dec=dec_np*u.deg, distance=dist*u.Mpc)
-    xyz = np.array([c.cartesian.x.value, c.cartesian.y.value, c.cartesian.z.value]).T
+    # Friends-of-Friends vs. a null ensemble with the same footprint and n(z)
+    print(f"-> Running Percolation (Linking Length = {LINKING_LENGTH} Mpc) on {config.N_SIMS} nulls...")
+    null_gen = randoms.RandomCatalogue(np.array(z_sub), ra=np.array(ra_sub), dec=np.array(dec_sub), seed=SEED)
+    key = significance.run_key(xyz, null_gen.draw, LINKING_LENGTH)
+    result = significance.run_null_ensemble(
+        xyz, null_gen.draw, LINKING_LENGTH, n_nulls=config.N_SIMS, seed=SEED,
+        checkpoint=f"data/processed/nulls_{name.split()[0].lower()}_{key}.npz")
     
-    # Friends-of-Friends
-    print("-> Running Percolation (Linking Length = 150 Mpc)...")
-    tree = cKDTree(xyz)
-    pairs = tree.query_pairs(150.0)
-    
-    G = nx.Graph()
-    G.add_nodes_from(range(len(z_sub)))
-    G.add_edges_from(pairs)
+    extent = result['observed_extent']
+    r_factor = result['rushing_factor']
+
+    # Jackknife error bar over sky regions (reuses one FoF labelling)
+    jk = resampling.RegionResampler(xyz, linking_length=LINKING_LENGTH).jackknife(['largest_extent'])
+    extent_err = jk['largest_extent']['error'][0]
     
-    # Metrics
-    if nx.number_of_nodes(G) > 0:
-        components = list(nx.connected_components(G))
-        largest = max(components, key=len)
-        max_nodes = len(largest)
-        
-        # Calculate Extent (Approximate Diagonal)
-        indices = list(largest)
-        pts = xyz[indices]
-        # Quick bounding box diagonal
-        mins = np.min(pts, axis=0)
-        maxs = np.max(pts, axis=0)
-        extent = np.linalg.norm(maxs - mins)
-        
-        # Null Baseline (Standard Random) ~ 380 Mpc
-        r_factor = extent / 380.0
-        
-        print(f"-> Largest Cluster: {max_nodes} nodes")
-        print(f"-> Physical Extent: {extent:.1f} Mpc")
-        print(f"-> Rushing Factor (R): {r_factor:.2f}")
-        return max_nodes, r_factor
-    else:
-        return 0, 0
+    print(f"-> Largest Cluster: {result['observed_size']} nodes")
+    print(f"-> Physical Extent: {extent:.1f} +/- {extent_err:.1f} Mpc (jackknife)")
+    print(f"-> Null Extent:     {np.median(result['extents']):.1f} Mpc (median of {config.N_SIMS})")
+    print(f"-> Rushing Factor (R): {r_factor:.2f}")
+    print(f"-> Percentile: {result['percentile']:.1f} | p-value: {result['p_value']:.3f}")
+    return result['observed_size'], r_factor
 
-# 4. EXECUTE & COMPARE
-nodes_N, r_N = analyze_hemisphere("NORTH (NGC)", north_set)
-nodes_S, r_S = analyze_hemisphere("SOUTH (SGC)", south_set)
+if __name__ == "__main__":
+    os.makedirs('data/processed', exist_ok=True)
 
-print("\n==========================================")
-print("       FALSIFICATION REPORT")
-print("==========================================")
-print(f"NORTH R-Factor: {r_N:.2f}")
-print(f"SOUTH R-Factor: {r_S:.2f}")
-delta = abs(r_N - r_S)
-print(f"Delta: {delta:.2f}")
+    # 1. LOAD DATA
+    fits_path = 'data/raw/desi/zpix-main-dark.fits'
+    print(f"-> Loading DESI Catalog: {fits_path}...")
+    with fits.open(fits_path, memmap=True) as hdul:
+        data = hdul[1].data
+        # Filter for Quasars (SPECTYPE='QSO') and Z > 0
+        mask = (data['SPECTYPE'] == 'QSO') & (data['Z'] > 0.0)
+        qsos = data[mask]
+
+    print(f"-> Total Quasars: {len(qsos)}")
+
+    # 2. SPLIT HEMISPHERES
+    # Standard Definition: NGC (North) vs SGC (South) usually split by Galactic Plane
+    # For RA approximation: NGC is roughly 100 < RA < 300, SGC is the rest
+    ra = qsos['TARGET_RA']
+    dec = qsos['TARGET_DEC']
+    z = qsos['Z']
+
+    # Simple RA split for speed (approximate NGC/SGC)
+    mask_north = (ra > 80) & (ra < 300)
+    mask_south = ~mask_north
+
+    north_set = {'ra': ra[mask_north], 'dec': dec[mask_north], 'z': z[mask_north]}
+    south_set = {'ra': ra[mask_south], 'dec': dec[mask_south], 'z': z[mask_south]}
+
+    print(f"-> North Sample: {len(north_set['ra'])}")
+    print(f"-> South Sample: {len(south_set['ra'])}")
+
+    # 3. EXECUTE & COMPARE
+    nodes_N, r_N = analyze_hemisphere("NORTH (NGC)", north_set)
+    nodes_S, r_S = analyze_hemisphere("SOUTH (SGC)", south_set)
+
+    print("\n==========================================")
+    print("       FALSIFICATION REPORT")
+    print("==========================================")
+    print(f"NORTH R-Factor: {r_N:.2f}")
+    print(f"SOUTH R-Factor: {r_S:.2f}")
+    delta = abs(r_N - r_S)
+    print(f"Delta: {delta:.2f}")
+
+    if r_N > 2.0 and r_S > 2.0 and delta < 1.0:
+        print("\n-> VERDICT: ROBUST. The anomaly is global.")
+    elif (r_N < 1.5) or (r_S < 1.5):
+        print("\n-> VERDICT: FALSIFIED. One or both hemispheres show no anomaly.")
+    else:
+        print("\n-> VERDICT: INCONCLUSIVE / LOCALIZED. Large disparity between hemispheres.")
 
-if r_N > 2.0 and r_S > 2.0 and delta < 1.0:
-    print("\n-> VERDICT: ROBUST. The anomaly is global.")
-elif (r_N < 1.5) or (r_S < 1.5):
-    print("\n-> VERDICT: FALSIFIED. One or both hemispheres show no anomaly.")
-else:
-    print("\n-> VERDICT: INCONCLUSIVE / LOCALIZED. Large disparity between hemispheres.")
+    # 4. ALL-SKY AXIS SCAN (one FoF, every HEALPix axis instead of one RA cut)
+    print("\n--- AXIS SCAN ---")
+    z_mask = (z > 1.5) & (z < 2.5)
+    ra_all, dec_all, z_all = np.array(ra[z_mask]), np.array(dec[z_mask]), np.array(z[z_mask])
+    xyz_all = ingestion.radec_to_cartesian(ra_all, dec_all, z_all)
+    scan = hemispheres.AxisScan.from_positions(xyz_all, LINKING_LENGTH)
+    result = scan.scan()
+    null_gen = randoms.RandomCatalogue(z_all, ra=ra_all, dec=dec_all, seed=SEED)
+    calib = scan.calibrate(result, null_gen.draw, LINKING_LENGTH, seed=SEED)
+    best = int(np.argmax(np.abs(result['asymmetry'])))
+    best_ra, best_dec = hp.pix2ang(scan.nside, best, lonlat=True)
+    print(f"-> Max |A| = {calib['max_asymmetry']:.3f} at RA={best_ra:.1f}, Dec={best_dec:.1f} "
+          f"(global p-value: {calib['p_value']:.3f})")
+    for name, entry in calib['axes'].items():
+        print(f"-> {name.upper():9s} axis: A = {entry['asymmetry']:+.3f} "
+              f"({entry['significance']:+.2f} sigma vs nulls, {entry['percentile']:.0f}th percentile of |A|)")
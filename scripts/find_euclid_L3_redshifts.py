@@ -1,34 +1,26 @@
-import boto3
-from botocore import UNSIGNED
-from botocore.client import Config
+from leviathan import euclid
 
-# Verified Bucket
-BUCKET_NAME = 'nasa-irsa-euclid-q1'
-REGION = 'us-east-1'
-
-s3 = boto3.client('s3', region_name=REGION, config=Config(signature_version=UNSIGNED))
+TILE_ID = 102018212
+PRODUCT_L3 = 'PHZ_PF_OUTPUT_FOR_L3'
 
 def find_L3_redshifts():
-    print(f"-> Probing PHZ L3 Directory for Tile 102018212...")
-    
-    # 1. Target the L3 directory
-    PREFIX_L3 = 'q1/catalogs/PHZ_PF_OUTPUT_FOR_L3/'
-    
-    # 2. We need to find the subdirectory for our specific Tile
+    print(f"-> Probing PHZ L3 Directory for Tile {TILE_ID}...")
+    manifest = euclid.Manifest()
+
     # Euclid organizes these as .../PHZ_PF_OUTPUT_FOR_L3/<TILE_ID>/...
-    target_prefix = f"{PREFIX_L3}102018212/"
-    
-    print(f"-> Listing files in: {target_prefix}")
-    
+    # (listed once into the local manifest, then queried locally)
+    print(f"-> Listing files in: {euclid.CATALOG_PREFIX}/{PRODUCT_L3}/{TILE_ID}/")
+
     try:
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=target_prefix)
-        
-        if 'Contents' in response:
+        manifest.refresh(products=[PRODUCT_L3], tiles=[TILE_ID])
+        objects = manifest.objects(TILE_ID, PRODUCT_L3)
+
+        if objects:
             print(f"-> FOUND REDSHIFT TABLES:")
-            for obj in response['Contents']:
-                key = obj['Key']
-                size_mb = obj['Size'] / 1024**2
-                
+            for obj in objects:
+                key = obj['key']
+                size_mb = obj['size'] / 1024**2
+
                 # We are looking for the "Physical Parameters" file
                 if 'PHYSICAL-PARAMS' in key or 'PHZ' in key:
                     print(f"   [TARGET] {key} ({size_mb:.2f} MB)")
@@ -37,14 +29,15 @@ def find_L3_redshifts():
         else:
             print("-> No files found. The Tile ID might be grouped differently.")
             print("-> Attempting to list base directory to check structure...")
-            base_resp = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=PREFIX_L3, Delimiter='/')
-            if 'CommonPrefixes' in base_resp:
-                print("-> Available Tile Directories (First 5):")
-                for p in base_resp['CommonPrefixes'][:5]:
-                    print(f"   - {p['Prefix']}")
+            tiles = euclid.list_directories(f"{euclid.CATALOG_PREFIX}/{PRODUCT_L3}/")
+            print(f"-> Available Tile Directories ({len(tiles)}, first 5):")
+            for p in tiles[:5]:
+                print(f"   - {p}")
 
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        manifest.close()
 
 if __name__ == "__main__":
     find_L3_redshifts()
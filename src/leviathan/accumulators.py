@@ -0,0 +1,288 @@
+"""
+Streaming Accumulators
+Summary statistics that are updated block by block and merged across tiles
+or workers, so survey-wide distributions need one pass and bounded memory:
+
+    Histogram       fixed-bin counts (plus under/overflow)
+    QuantileSketch  relative-error quantiles (logarithmic buckets)
+    RangeCounts     counts in named value ranges (e.g. the z = 3-6 desert)
+    Moments         count, min, max, mean and variance
+
+Merging is associative and commutative (results do not depend on how the
+data were split), and every accumulator round-trips through JSON so
+per-tile results can be cached and combined later.
+"""
+
+import os
+import json
+import numpy as np
+
+# Accumulator classes by name (for deserialisation)
+_TYPES = {}
+
+def _register(cls):
+    _TYPES[cls.__name__] = cls
+    return cls
+
+def _finite(values):
+    values = np.asarray(values, dtype=float).ravel()
+    return values[np.isfinite(values)]
+
+@_register
+class Histogram:
+    """
+    Counts in fixed bins [edges[i], edges[i+1]) (last bin closed).
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1)
+        self.underflow = 0.0
+        self.overflow = 0.0
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=float).ravel()
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float).ravel()
+        good = np.isfinite(values)
+        values, weights = values[good], weights[good]
+        idx = np.searchsorted(self.edges, values, side='right') - 1
+        idx[values == self.edges[-1]] = len(self.counts) - 1
+        inside = (idx >= 0) & (idx < len(self.counts))
+        self.counts += np.bincount(idx[inside], weights=weights[inside], minlength=len(self.counts))
+        self.underflow += float(np.sum(weights[values < self.edges[0]]))
+        self.overflow += float(np.sum(weights[values > self.edges[-1]]))
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bin edges.")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    @property
+    def total(self):
+        return float(self.counts.sum() + self.underflow + self.overflow)
+
+    def to_dict(self):
+        return {'edges': self.edges.tolist(), 'counts': self.counts.tolist(),
+                'underflow': self.underflow, 'overflow': self.overflow}
+
+    @classmethod
+    def from_dict(cls, d):
+        out = cls(d['edges'])
+        out.counts = np.asarray(d['counts'], dtype=float)
+        out.underflow, out.overflow = d['underflow'], d['overflow']
+        return out
+
+@_register
+class QuantileSketch:
+    """
+    Quantiles with relative accuracy alpha (DDSketch-style): values are
+    counted in logarithmic buckets gamma^(k-1) < |x| <= gamma^k with
+    gamma = (1 + alpha) / (1 - alpha), so merging is bucket addition and
+    any quantile is within a fraction alpha of the exact order statistic.
+    """
+
+    def __init__(self, alpha=0.005, min_value=1e-9):
+        self.alpha = alpha
+        self.min_value = min_value
+        self.log_gamma = np.log((1 + alpha) / (1 - alpha))
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+
+    def _add(self, store, magnitudes):
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            store[k] = store.get(k, 0) + c
+
+    def update(self, values):
+        values = _finite(values)
+        self._add(self.positive, values[values > self.min_value])
+        self._add(self.negative, -values[values < -self.min_value])
+        self.zero += int(np.sum(np.abs(values) <= self.min_value))
+        return self
+
+    def merge(self, other):
+        if other.alpha != self.alpha or other.min_value != self.min_value:
+            raise ValueError("Cannot merge sketches with different accuracy settings.")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for k, c in theirs.items():
+                mine[k] = mine.get(k, 0) + c
+        self.zero += other.zero
+        return self
+
+    @property
+    def count(self):
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zero
+
+    def quantile(self, q):
+        """Value at quantile(s) q in [0, 1] (NaN when empty)."""
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        n = self.count
+        if n == 0:
+            return np.full(q.shape, np.nan) if q.size > 1 else float('nan')
+        # Buckets in ascending value order: negatives (largest |x| first), zero, positives
+        neg = sorted(self.negative, reverse=True)
+        pos = sorted(self.positive)
+        gamma = np.exp(self.log_gamma)
+        values = np.concatenate([-2 * gamma**np.array(neg, dtype=float) / (gamma + 1),
+                                 [0.0],
+                                 2 * gamma**np.array(pos, dtype=float) / (gamma + 1)])
+        counts = np.concatenate([[self.negative[k] for k in neg], [self.zero],
+                                 [self.positive[k] for k in pos]])
+        cumulative = np.cumsum(counts)
+        rank = np.clip(np.floor(q * (n - 1)), 0, n - 1)
+        out = values[np.searchsorted(cumulative, rank, side='right')]
+        return out if out.size > 1 else float(out[0])
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'min_value': self.min_value, 'zero': self.zero,
+                'positive': {str(k): c for k, c in self.positive.items()},
+                'negative': {str(k): c for k, c in self.negative.items()}}
+
+    @classmethod
+    def from_dict(cls, d):
+        out = cls(d['alpha'], d['min_value'])
+        out.zero = d['zero']
+        out.positive = {int(k): c for k, c in d['positive'].items()}
+        out.negative = {int(k): c for k, c in d['negative'].items()}
+        return out
+
+@_register
+class RangeCounts:
+    """
+    Counts in named open ranges lo < x < hi, plus the total seen.
+    """
+
+    def __init__(self, ranges):
+        """
+        Args:
+            ranges (dict): name -> (lo, hi), e.g. {'desert': (3.0, 6.0)}.
+        """
+        self.ranges = {name: (float(lo), float(hi)) for name, (lo, hi) in ranges.items()}
+        self.counts = {name: 0 for name in self.ranges}
+        self.total = 0
+
+    def update(self, values):
+        values = _finite(values)
+        for name, (lo, hi) in self.ranges.items():
+            self.counts[name] += int(np.count_nonzero((values > lo) & (values < hi)))
+        self.total += len(values)
+        return self
+
+    def merge(self, other):
+        if other.ranges != self.ranges:
+            raise ValueError("Cannot merge range counts over different ranges.")
+        for name in self.counts:
+            self.counts[name] += other.counts[name]
+        self.total += other.total
+        return self
+
+    def fraction(self, name, of=None):
+        """Count in range `name` over the count in range `of` (or the total)."""
+        denom = self.total if of is None else self.counts[of]
+        return self.counts[name] / denom if denom else np.nan
+
+    def to_dict(self):
+        return {'ranges': {k: list(v) for k, v in self.ranges.items()},
+                'counts': self.counts, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, d):
+        out = cls(d['ranges'])
+        out.counts, out.total = dict(d['counts']), d['total']
+        return out
+
+@_register
+class Moments:
+    """
+    Count, min, max, mean and variance (pairwise-merged, numerically stable).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _combine(self, n, mean, m2, lo, hi):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.n * n / total
+        self.n = total
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+        return self
+
+    def update(self, values):
+        values = _finite(values)
+        if len(values) == 0:
+            return self
+        mean = float(values.mean())
+        return self._combine(len(values), mean, float(np.sum((values - mean)**2)),
+                             float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        return self._combine(other.n, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min if self.n else None, 'max': self.max if self.n else None}
+
+    @classmethod
+    def from_dict(cls, d):
+        out = cls()
+        out.n, out.mean, out.m2 = d['n'], d['mean'], d['m2']
+        out.min = d['min'] if d['min'] is not None else np.inf
+        out.max = d['max'] if d['max'] is not None else -np.inf
+        return out
+
+# --- COLLECTIONS ---
+
+def merge(accumulators):
+    """
+    Merges accumulator dicts (name -> accumulator) from several tiles or
+    workers into a new dict.
+    """
+    accumulators = list(accumulators)
+    if not accumulators:
+        return {}
+    out = {name: from_dict(to_dict(acc)) for name, acc in accumulators[0].items()}
+    for other in accumulators[1:]:
+        for name, acc in other.items():
+            out[name].merge(acc)
+    return out
+
+def to_dict(acc):
+    return {'type': type(acc).__name__, 'state': acc.to_dict()}
+
+def from_dict(d):
+    return _TYPES[d['type']].from_dict(d['state'])
+
+def save(accumulators, path):
+    """Writes a dict of accumulators to JSON (atomically)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({name: to_dict(acc) for name, acc in accumulators.items()}, f)
+    os.replace(tmp, path)
+
+def load(path):
+    """Reads a dict of accumulators written by save()."""
+    with open(path) as f:
+        return {name: from_dict(d) for name, d in json.load(f).items()}
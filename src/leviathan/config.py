@@ -17,6 +17,18 @@ L_MAX = 100
 # Monte Carlo parameters for the Null-Test Engine
 N_SIMS = 100  # Minimum required for significance testing
 
+# Disk cache for expensive derived products (e.g. mask coupling matrices)
+CACHE_DIR = 'data/processed/cache'
+
+
+# --- COSMOLOGY (Planck 2018, flat LCDM) ---
+H0 = 67.4               # km/s/Mpc
+OMEGA_M = 0.315
+OMEGA_L = 1.0 - OMEGA_M
+
+# 1 km/s/Mpc in Gyr^-1 (H0 * KMS_MPC_TO_GYR = H0 in Gyr^-1)
+KMS_MPC_TO_GYR = 0.001022
+
 
 # --- AGENCY FRAME GEOMETRY (J2000 Epoch) ---
 # Coordinates of the Solar Angular Momentum Vector (The Sun's North Pole).
@@ -0,0 +1,228 @@
+"""
+Two-Point Clustering Engine
+Landy-Szalay estimates of xi(r) and xi(r_p, pi) from data and random
+catalogues, with jackknife covariances from the same pass.
+
+Data and randoms are split into the same K sky regions. Pair counts are
+accumulated as a (K, K, bins) region-pair matrix: one worker task per region
+of the first catalogue, counted against the nearby regions of the second.
+xi(r) uses dual-tree cumulative counts (cKDTree.count_neighbors, optional
+weights); xi(r_p, pi) enumerates pairs within s_max per region pair.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from leviathan import parallel
+from leviathan.validation import resampling
+
+# Number of sky regions (parallel chunks and jackknife samples)
+N_REGIONS = 64
+
+# Worker-global catalogues (set once per process by _init_worker)
+_WORKER = {}
+
+class _Catalogue:
+    """Positions, weights and per-region trees of one catalogue."""
+
+    def __init__(self, positions, weights, regions, n_regions):
+        self.positions = np.asarray(positions, dtype=float)
+        self.weights = np.ones(len(self.positions)) if weights is None else np.asarray(weights, dtype=float)
+        self.index = [np.flatnonzero(regions == a) for a in range(n_regions)]
+        self.region_weight = np.array([self.weights[i].sum() for i in self.index])
+        self.region_weight2 = np.array([np.sum(self.weights[i]**2) for i in self.index])
+        self.centres = np.array([self.positions[i].mean(axis=0) if len(i) else np.zeros(3)
+                                 for i in self.index])
+        self.radii = np.array([np.max(np.linalg.norm(self.positions[i] - c, axis=1)) if len(i) else -np.inf
+                               for i, c in zip(self.index, self.centres)])
+        self._trees = {}
+
+    def tree(self, a):
+        if a not in self._trees:
+            self._trees[a] = cKDTree(self.positions[self.index[a]])
+        return self._trees[a]
+
+    def neighbours(self, other, a, s_max):
+        """Regions of `other` whose bounding spheres come within s_max of region a."""
+        gap = np.linalg.norm(other.centres - self.centres[a], axis=1) - other.radii - self.radii[a]
+        return np.flatnonzero(gap <= s_max)
+
+def _count_block(cat1, a, cat2, b, edges, auto):
+    """Binned weighted pair counts between region a of cat1 and region b of cat2."""
+    i1, i2 = cat1.index[a], cat2.index[b]
+    if len(i1) == 0 or len(i2) == 0:
+        return None
+    w1, w2 = cat1.weights[i1], cat2.weights[i2]
+
+    if len(edges) == 1: # 3D separations: dual-tree cumulative counts
+        cumulative = cat1.tree(a).count_neighbors(cat2.tree(b), edges[0], weights=(w1, w2))
+        return np.diff(cumulative)
+
+    # (r_p, pi): enumerate pairs within s_max
+    rp_edges, pi_edges = edges
+    s_max = np.hypot(rp_edges[-1], pi_edges[-1])
+    pairs = cat1.tree(a).sparse_distance_matrix(cat2.tree(b), s_max, output_type='ndarray')
+    i, j = pairs['i'], pairs['j']
+    if auto and a == b:
+        keep = i != j
+        i, j = i[keep], j[keep]
+    x1, x2 = cat1.positions[i1[i]], cat2.positions[i2[j]]
+    sep = x2 - x1
+    los = x1 + x2
+    los /= np.linalg.norm(los, axis=1)[:, None]
+    pi = np.abs(np.sum(sep * los, axis=1))
+    rp = np.sqrt(np.maximum(np.sum(sep**2, axis=1) - pi**2, 0.0))
+    counts, _, _ = np.histogram2d(rp, pi, bins=(rp_edges, pi_edges), weights=w1[i] * w2[j])
+    return counts
+
+def region_pair_counts(cat1, cat2, edges, auto=False, n_workers=None):
+    """
+    Weighted pair counts for every pair of regions.
+
+    Args:
+        cat1, cat2 (_Catalogue): Catalogues split into the same regions.
+        edges (tuple): (r_edges,) for xi(r) or (rp_edges, pi_edges).
+        auto (bool): cat1 is cat2 (only b >= a is counted, then mirrored).
+
+    Returns:
+        array: (K, K, *bins) matrix of ordered-pair counts.
+    """
+    k = len(cat1.index)
+    s_max = edges[0][-1] if len(edges) == 1 else np.hypot(edges[0][-1], edges[1][-1])
+    tasks = []
+    for a in range(k):
+        bs = cat1.neighbours(cat2, a, s_max)
+        tasks.append((a, bs[bs >= a] if auto else bs))
+
+    shape = tuple(len(e) - 1 for e in edges)
+    matrix = np.zeros((k, k) + shape)
+    results = parallel.map_tasks(_count_task, tasks, n_workers=n_workers,
+                                 initializer=_init_worker, initargs=(cat1, cat2, edges, auto))
+    for a, blocks in results:
+        for b, counts in blocks:
+            matrix[a, b] = counts
+            if auto and b != a:
+                matrix[b, a] = counts
+    return matrix
+
+def _landy_szalay(dd, dr, rr, n):
+    """xi from normalised counts; n = (W_D^2 - S_D, W_D W_R, W_R^2 - S_R)."""
+    dd, dr, rr = dd / n[0], dr / n[1], rr / n[2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xi = (dd - 2 * dr + rr) / rr
+    return np.where(rr > 0, xi, np.nan)
+
+def _estimate(data, randoms, edges, n_workers):
+    """Shared LS driver: full xi plus the K delete-one-region estimates."""
+    print("-> Counting DD...")
+    dd = region_pair_counts(data, data, edges, auto=True, n_workers=n_workers)
+    print("-> Counting DR...")
+    dr = region_pair_counts(data, randoms, edges, n_workers=n_workers)
+    print("-> Counting RR...")
+    rr = region_pair_counts(randoms, randoms, edges, auto=True, n_workers=n_workers)
+
+    def totals(m):
+        total = m.sum(axis=(0, 1))
+        # pairs with either member in region k
+        touching = m.sum(axis=1) + m.sum(axis=0) - np.einsum('kk...->k...', m)
+        return total, total - touching
+
+    wd, sd = data.region_weight, data.region_weight2
+    wr, sr = randoms.region_weight, randoms.region_weight2
+    norm = (wd.sum()**2 - sd.sum(), wd.sum() * wr.sum(), wr.sum()**2 - sr.sum())
+    wd_k, wr_k = wd.sum() - wd, wr.sum() - wr
+    norm_k = (wd_k**2 - (sd.sum() - sd), wd_k * wr_k, wr_k**2 - (sr.sum() - sr))
+    expand = (slice(None),) + (None,) * len(edges)
+
+    (dd_t, dd_k), (dr_t, dr_k), (rr_t, rr_k) = totals(dd), totals(dr), totals(rr)
+    xi = _landy_szalay(dd_t, dr_t, rr_t, norm)
+    xi_k = _landy_szalay(dd_k, dr_k, rr_k, tuple(n[expand] for n in norm_k))
+
+    k = len(wd)
+    mean = np.nanmean(xi_k, axis=0)
+    flat = (xi_k - mean).reshape(k, -1)
+    cov = (k - 1) / k * flat.T @ flat
+    return {
+        'xi': xi,
+        'dd': dd_t / norm[0], 'dr': dr_t / norm[1], 'rr': rr_t / norm[2],
+        'xi_jackknife': xi_k,
+        'covariance': cov,
+        'error': np.sqrt(np.diag(cov)).reshape(xi.shape),
+    }
+
+def _split(data, randoms, data_weights, random_weights, n_regions, regions):
+    """Assigns data and randoms to common regions (defined by the data)."""
+    if regions is None:
+        pixel_region = resampling.region_map(data, n_regions)
+        regions = (resampling.regions_from_map(data, pixel_region),
+                   resampling.regions_from_map(randoms, pixel_region))
+    k = int(max(regions[0].max(), regions[1].max())) + 1
+    return (_Catalogue(data, data_weights, regions[0], k),
+            _Catalogue(randoms, random_weights, regions[1], k))
+
+def correlation_function(data, randoms, r_edges, data_weights=None, random_weights=None,
+                         n_regions=N_REGIONS, regions=None, n_workers=None):
+    """
+    Landy-Szalay xi(r) with jackknife errors.
+
+    Args:
+        data, randoms (array): (N, 3) comoving positions (Mpc). Randoms may be
+            10-50x denser than the data.
+        r_edges (array): Separation bin edges (Mpc).
+        data_weights, random_weights (array): Optional per-object weights
+            (e.g. FKP or systematics).
+        n_regions (int): Sky regions (jackknife samples and parallel chunks).
+        regions (tuple): Optional precomputed (data, random) region indices.
+        n_workers (int): Worker processes (default: all cores).
+
+    Returns:
+        dict: 'r' (bin centres), 'xi', normalised 'dd'/'dr'/'rr', the K
+        delete-one 'xi_jackknife' estimates, 'covariance' and 'error'.
+    """
+    r_edges = np.asarray(r_edges, dtype=float)
+    d, r = _split(data, randoms, data_weights, random_weights, n_regions, regions)
+    out = _estimate(d, r, (r_edges,), n_workers)
+    out['r'] = 0.5 * (r_edges[1:] + r_edges[:-1])
+    return out
+
+def correlation_function_2d(data, randoms, rp_edges, pi_edges, data_weights=None, random_weights=None,
+                            n_regions=N_REGIONS, regions=None, n_workers=None):
+    """
+    Landy-Szalay xi(r_p, pi) and the projected w_p(r_p) with jackknife errors.
+
+    The line of sight of each pair is its mid-point direction. Pairs are
+    enumerated within sqrt(rp_max^2 + pi_max^2), so very dense randoms at
+    large pi_max are expensive; 10x randoms are usually enough here.
+
+    Returns:
+        dict: 'rp', 'pi' (bin centres), 'xi' of shape (n_rp, n_pi), 'wp'
+        (2 * sum xi d_pi) with 'wp_error', plus the xi jackknife outputs.
+    """
+    rp_edges, pi_edges = np.asarray(rp_edges, dtype=float), np.asarray(pi_edges, dtype=float)
+    d, r = _split(data, randoms, data_weights, random_weights, n_regions, regions)
+    out = _estimate(d, r, (rp_edges, pi_edges), n_workers)
+
+    dpi = np.diff(pi_edges)
+    wp_k = 2 * np.nansum(out['xi_jackknife'] * dpi, axis=-1)
+    k = len(wp_k)
+    dev = wp_k - wp_k.mean(axis=0)
+    out['wp'] = 2 * np.nansum(out['xi'] * dpi, axis=-1)
+    out['wp_covariance'] = (k - 1) / k * dev.T @ dev
+    out['wp_error'] = np.sqrt(np.diag(out['wp_covariance']))
+    out['rp'] = 0.5 * (rp_edges[1:] + rp_edges[:-1])
+    out['pi'] = 0.5 * (pi_edges[1:] + pi_edges[:-1])
+    return out
+
+def _init_worker(cat1, cat2, edges, auto):
+    _WORKER.update(cat1=cat1, cat2=cat2, edges=edges, auto=auto)
+
+def _count_task(task):
+    a, bs = task
+    cat1, cat2 = _WORKER['cat1'], _WORKER['cat2']
+    blocks = []
+    for b in bs:
+        counts = _count_block(cat1, a, cat2, b, _WORKER['edges'], _WORKER['auto'])
+        if counts is not None:
+            blocks.append((b, counts))
+    # Free this region's tree: each region is visited by one task only
+    cat1._trees.pop(a, None)
+    return a, blocks
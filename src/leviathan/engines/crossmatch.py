@@ -0,0 +1,126 @@
+"""
+Sky Cross-Match Engine
+Positional matching between catalogues (e.g. DESI spectroscopic redshifts
+against Euclid photo-z) on the unit sphere.
+
+Positions become unit vectors, so an angular radius theta is the chord
+2 sin(theta / 2) and all searches are Euclidean KD-tree queries. One
+catalogue is held in a tree (built once per worker); the other is
+streamed through in chunks that are matched in parallel. Results are
+compact index / separation arrays rather than tables.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from leviathan import parallel
+
+# Rows of the streamed catalogue per task
+CHUNK_ROWS = 250_000
+
+# Worker-global tree (set once per process by _init_worker)
+_WORKER = {}
+
+def unit_vectors(ra, dec):
+    """(N, 3) unit vectors of equatorial coordinates (deg)."""
+    ra, dec = np.radians(np.asarray(ra, dtype=float)), np.radians(np.asarray(dec, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.column_stack((cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)))
+
+def arcsec_to_chord(radius_arcsec):
+    return 2 * np.sin(np.radians(radius_arcsec / 3600.0) / 2)
+
+def chord_to_arcsec(chord):
+    return np.degrees(2 * np.arcsin(np.clip(chord / 2, 0.0, 1.0))) * 3600.0
+
+def _index_dtype(n):
+    return np.int32 if n < 2**31 else np.int64
+
+def _chunks(vectors, chunk_rows):
+    for start in range(0, len(vectors), chunk_rows):
+        yield start, vectors[start:start + chunk_rows]
+
+def _run(task_func, tree_vectors, query_vectors, chord, n_workers, chunk_rows):
+    tasks = ((start, chunk, chord) for start, chunk in _chunks(query_vectors, chunk_rows))
+    results = list(parallel.map_tasks(task_func, tasks, n_workers=n_workers,
+                                      initializer=_init_worker, initargs=(tree_vectors,)))
+    if not results:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+def match_nearest(ra1, dec1, ra2, dec2, radius_arcsec, n_workers=None, chunk_rows=CHUNK_ROWS):
+    """
+    Nearest catalogue-2 counterpart of every catalogue-1 object within a
+    radius. Catalogue 2 is held in the tree and catalogue 1 is streamed,
+    so pass the larger catalogue first.
+
+    Returns:
+        (array, array, array): idx1, idx2 and separation (arcsec, float32)
+        of each matched catalogue-1 object, ordered by idx1.
+    """
+    chord = arcsec_to_chord(radius_arcsec)
+    i1, i2, dist = _run(_nearest_task, unit_vectors(ra2, dec2), unit_vectors(ra1, dec1),
+                        chord, n_workers, chunk_rows)
+    return (i1.astype(_index_dtype(len(ra1))), i2.astype(_index_dtype(len(ra2))),
+            chord_to_arcsec(dist).astype(np.float32))
+
+def match_radius(ra1, dec1, ra2, dec2, radius_arcsec, n_workers=None, chunk_rows=CHUNK_ROWS):
+    """
+    All pairs closer than a radius. The smaller catalogue is held in the
+    tree and the larger one streamed.
+
+    Returns:
+        (array, array, array): idx1, idx2 and separation (arcsec, float32)
+        of every pair, ordered by (idx1, idx2).
+    """
+    chord = arcsec_to_chord(radius_arcsec)
+    vec1, vec2 = unit_vectors(ra1, dec1), unit_vectors(ra2, dec2)
+    swap = len(vec1) < len(vec2)
+    tree_vec, query_vec = (vec1, vec2) if swap else (vec2, vec1)
+    iq, it, dist = _run(_radius_task, tree_vec, query_vec, chord, n_workers, chunk_rows)
+    i1, i2 = (it, iq) if swap else (iq, it)
+    order = np.lexsort((i2, i1))
+    return (i1[order].astype(_index_dtype(len(vec1))), i2[order].astype(_index_dtype(len(vec2))),
+            chord_to_arcsec(dist[order]).astype(np.float32))
+
+def match_many(catalogues, reference, radius_arcsec, n_workers=None, chunk_rows=CHUNK_ROWS):
+    """
+    Nearest counterparts of a reference catalogue in every other catalogue.
+
+    Args:
+        catalogues (dict): name -> (ra, dec) arrays (deg).
+        reference (str): Name of the catalogue to match from.
+
+    Returns:
+        dict: name -> {'index': counterpart index per reference object
+        (-1 if none), 'separation': arcsec (NaN if none)}, plus 'n_matched'
+        per reference object (number of catalogues with a counterpart).
+    """
+    ra, dec = catalogues[reference]
+    n_ref = len(ra)
+    out = {}
+    n_matched = np.zeros(n_ref, dtype=np.int16)
+    for name, (ra2, dec2) in catalogues.items():
+        if name == reference:
+            continue
+        i1, i2, sep = match_nearest(ra, dec, ra2, dec2, radius_arcsec, n_workers, chunk_rows)
+        index = np.full(n_ref, -1, dtype=_index_dtype(len(ra2)))
+        separation = np.full(n_ref, np.nan, dtype=np.float32)
+        index[i1], separation[i1] = i2, sep
+        n_matched[i1] += 1
+        out[name] = {'index': index, 'separation': separation}
+    out['n_matched'] = n_matched
+    return out
+
+def _init_worker(tree_vectors):
+    _WORKER['tree'] = cKDTree(tree_vectors)
+
+def _nearest_task(task):
+    start, chunk, chord = task
+    dist, idx = _WORKER['tree'].query(chunk, k=1, distance_upper_bound=chord)
+    found = np.isfinite(dist)
+    return np.flatnonzero(found) + start, idx[found], dist[found]
+
+def _radius_task(task):
+    start, chunk, chord = task
+    pairs = cKDTree(chunk).sparse_distance_matrix(_WORKER['tree'], chord, output_type='ndarray')
+    return pairs['i'].astype(np.int64) + start, pairs['j'].astype(np.int64), pairs['v']
@@ -0,0 +1,264 @@
+"""
+Stochastic Growth Engine
+Langevin ensembles of density perturbations growing with the Hubble drift
+under redshift-dependent noise,
+
+    d delta = H(t) delta dt + A (1 + z)^k dW,
+
+for whole (k, A) parameter grids at once (the Boltzmann derivation), and
+the deterministic variance equation of the same model solved by quadrature
+over (D0, k, V0) grids (the variance derivation).
+
+The background (flat LCDM from config, no radiation) is analytic: t(z),
+z(t), a(t) and H(t) are evaluated once on the step grid. The Euler
+recursion is linear in delta with additive noise, so with common random
+numbers every amplitude follows from one unit-amplitude run per k:
+delta_A = G delta_0 + A X_k. Only the k axis is simulated; all amplitudes
+are evaluated at the checkpoints.
+"""
+
+from functools import lru_cache
+import numpy as np
+from scipy.integrate import cumulative_trapezoid
+from leviathan import config, parallel
+
+# Step grid of the simulation
+Z_START = 20.0
+N_STEPS = 1000
+
+# Checkpoint redshifts where the rushing factor is recorded
+CHECKPOINTS = (10.0, 2.0, 0.5)
+
+# Initial perturbation amplitude
+DELTA_0 = 0.01
+
+def hubble_e(z):
+    """E(z) = H(z) / H0 for the config cosmology."""
+    return np.sqrt(config.OMEGA_M * (1 + z)**3 + config.OMEGA_L)
+
+def cosmic_age(z):
+    """Age (Gyr) at redshift z, flat matter + Lambda (closed form)."""
+    h0 = config.H0 * config.KMS_MPC_TO_GYR
+    x = np.sqrt(config.OMEGA_L / config.OMEGA_M) * (1 + np.asarray(z, dtype=float))**-1.5
+    return 2 / (3 * h0 * np.sqrt(config.OMEGA_L)) * np.arcsinh(x)
+
+def age_to_redshift(t):
+    """Inverse of cosmic_age."""
+    h0 = config.H0 * config.KMS_MPC_TO_GYR
+    s = np.sinh(1.5 * h0 * np.sqrt(config.OMEGA_L) * np.asarray(t, dtype=float))
+    return (np.sqrt(config.OMEGA_L / config.OMEGA_M) / s)**(2 / 3) - 1
+
+@lru_cache(maxsize=8)
+def timeline(z_start=Z_START, z_end=0.0, n_steps=N_STEPS):
+    """
+    Background on a uniform time grid from z_start to z_end.
+
+    Returns:
+        dict: 't' (Gyr), 'z', 'a', 'H' (Gyr^-1) per step and the step 'dt'.
+    """
+    t = np.linspace(cosmic_age(z_start), cosmic_age(z_end), n_steps)
+    z = np.maximum(age_to_redshift(t), z_end)
+    return {
+        't': t,
+        'z': z,
+        'a': 1 / (1 + z),
+        'H': config.H0 * config.KMS_MPC_TO_GYR * hubble_e(z),
+        'dt': (t[-1] - t[0]) / (n_steps - 1),
+    }
+
+def checkpoint_steps(z, checkpoints):
+    """First step at or below each checkpoint redshift (z decreasing)."""
+    return np.array([int(np.argmax(z <= c)) if np.any(z <= c) else -1 for c in checkpoints])
+
+def _unit_runs(k, n_particles, seed, line, steps):
+    """
+    Growth factor G and unit-amplitude stochastic parts X (n_k, n_particles)
+    recorded at the checkpoint steps.
+    """
+    rng = np.random.default_rng(seed)
+    k = np.asarray(k, dtype=float)
+    dt = line['dt']
+    x = np.zeros((len(k), n_particles))
+    growth = 1.0
+    stored_x, stored_g = {}, {}
+    wanted = set(steps.tolist())
+    for i in range(len(line['t'])):
+        # Same noise for every k (common random numbers)
+        xi = rng.normal(0.0, np.sqrt(dt), n_particles)
+        factor = 1 + line['H'][i] * dt
+        x = factor * x + (1 + line['z'][i])**k[:, None] * xi[None, :]
+        growth *= factor
+        if i in wanted:
+            stored_x[i], stored_g[i] = x.copy(), growth
+    return stored_g, stored_x
+
+def langevin_ensemble(k, amplitude, checkpoints=CHECKPOINTS, n_particles=2000, delta0=DELTA_0,
+                      seed=None, n_workers=1, block_size=None, z_start=Z_START, n_steps=N_STEPS):
+    """
+    Rushing factors R = <|delta|> / (delta0 a / a_start) at the checkpoint
+    redshifts for every (k, amplitude) pair.
+
+    Args:
+        k (array): Noise exponents.
+        amplitude (array): Noise amplitudes A.
+        n_particles (int): Realisations per parameter pair.
+        seed (int): Seed of the (shared) noise stream; results do not
+            depend on n_workers or block_size.
+        n_workers (int): Processes for blocks of k values.
+        block_size (int): k values per task (default: split evenly).
+
+    Returns:
+        dict: 'R' of shape (n_k, n_amplitude, n_checkpoints), the 'k',
+        'amplitude' and 'checkpoints' grids, and 'z_recorded' (redshift of
+        the step where each checkpoint was recorded).
+    """
+    k = np.atleast_1d(np.asarray(k, dtype=float))
+    amplitude = np.atleast_1d(np.asarray(amplitude, dtype=float))
+    line = timeline(z_start, 0.0, n_steps)
+    steps = checkpoint_steps(line['z'], checkpoints)
+    if np.any(steps < 0):
+        raise ValueError("Checkpoint redshift outside the simulated range.")
+    seed = np.random.SeedSequence().entropy if seed is None else seed
+
+    n_workers = n_workers or parallel.default_workers()
+    block_size = block_size or max(1, -(-len(k) // n_workers))
+    tasks = [(k[i:i + block_size], amplitude, n_particles, delta0, seed, z_start, n_steps, tuple(checkpoints))
+             for i in range(0, len(k), block_size)]
+    blocks = parallel.map_tasks(_ensemble_task, tasks, n_workers=n_workers)
+    return {
+        'R': np.concatenate(list(blocks), axis=0),
+        'k': k,
+        'amplitude': amplitude,
+        'checkpoints': np.asarray(checkpoints, dtype=float),
+        'z_recorded': line['z'][steps],
+    }
+
+def _ensemble_task(task):
+    k, amplitude, n_particles, delta0, seed, z_start, n_steps, checkpoints = task
+    line = timeline(z_start, 0.0, n_steps)
+    steps = checkpoint_steps(line['z'], checkpoints)
+    growth, x = _unit_runs(k, n_particles, seed, line, steps)
+    out = np.zeros((len(k), len(amplitude), len(steps)))
+    for c, step in enumerate(steps):
+        expected = delta0 * line['a'][step] / line['a'][0]
+        for j, amp in enumerate(amplitude):
+            out[:, j, c] = np.mean(np.abs(growth[step] * delta0 + amp * x[step]), axis=1) / expected
+    return out
+
+# --- VARIANCE EQUATION ---
+#
+# dV/dt = 2 f H V + 2 D(z), D = D0 (1 + z)^k, written in redshift:
+#   dV/dz = -p(z) V + D0 q_k(z),  p = 2 f / (1 + z),  q_k = -2 (1 + z)^(k-1) / H.
+# With the integrating factor mu(z) = exp(int_{z_start}^{z} p dz'),
+#   V(z) = [V0 + D0 I_k(z)] / mu(z),  I_k(z) = int_{z_start}^{z} mu q_k dz',
+# so whole (D0, k, V0) grids need one cumulative integral per k, and the
+# rushing factor R = sqrt(V / V_std) = sqrt(1 + (D0 / V0) I_k) does not
+# depend on mu at all.
+
+# Redshift grid of the variance equation (integrated from high z down)
+Z_VARIANCE_START = 100.0
+N_VARIANCE_Z = 4000
+
+# Redshift range of the power-law fit R ~ (1 + z)^alpha
+ALPHA_FIT_RANGE = (0.1, 10.0)
+
+def growth_rate(z):
+    """Linear growth rate f = Omega_m(z)^0.55."""
+    omega_m = config.OMEGA_M * (1 + z)**3 / hubble_e(z)**2
+    return omega_m**0.55
+
+def variance_grid(z_start=Z_VARIANCE_START, n_z=N_VARIANCE_Z):
+    """Default redshift grid (decreasing from z_start to 0)."""
+    return np.linspace(z_start, 0.0, n_z)
+
+def _integrating_factor(z):
+    p = 2 * growth_rate(z) / (1 + z)
+    return np.exp(cumulative_trapezoid(p, z, initial=0.0))
+
+def diffusion_integrals(k, z):
+    """I_k(z) for every k: array (n_k, n_z)."""
+    k = np.atleast_1d(np.asarray(k, dtype=float))
+    mu = _integrating_factor(z)
+    hubble = config.H0 * config.KMS_MPC_TO_GYR * hubble_e(z)
+    integrand = mu * -2 * (1 + z)**(k[:, None] - 1) / hubble
+    return cumulative_trapezoid(integrand, z, axis=1, initial=0.0)
+
+def solve_variance(d0, k, v0=1e-5, z=None):
+    """
+    Variance evolution for broadcastable arrays of D0, k and V0.
+
+    Returns:
+        dict: 'z', 'V' and 'V_std' (D0 = 0) with shape broadcast(d0, k, v0)
+        + (n_z,), and the rushing factor 'R' = sqrt(V / V_std).
+    """
+    z = variance_grid() if z is None else np.asarray(z, dtype=float)
+    d0, k, v0 = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (d0, k, v0)))
+    k_unique, k_index = np.unique(k, return_inverse=True)
+    integrals = diffusion_integrals(k_unique, z)[k_index.reshape(k.shape)]
+    mu = _integrating_factor(z)
+    v = (v0[..., None] + d0[..., None] * integrals) / mu
+    v_std = np.broadcast_to(v0[..., None] / mu, v.shape)
+    return {'z': z, 'V': v, 'V_std': v_std, 'R': np.sqrt(v / v_std)}
+
+def fit_alpha(z, r, z_range=ALPHA_FIT_RANGE):
+    """
+    Least-squares power law R = A (1 + z)^alpha over z_range, for every
+    leading index of r at once.
+
+    Returns:
+        (array, array): alpha and A.
+    """
+    mask = (z > z_range[0]) & (z < z_range[1])
+    x = np.log1p(z[mask])
+    w = (x - x.mean()) / np.sum((x - x.mean())**2)
+    log_r = np.log(r[..., mask])
+    alpha = log_r @ w
+    return alpha, np.exp(log_r.mean(axis=-1) - alpha * x.mean())
+
+def variance_landscape(d0, k, v0=(1e-5,), target=1.26, z=None, z_range=ALPHA_FIT_RANGE):
+    """
+    Fitted alpha over the full (V0, D0, k) grid, and the k that reproduces
+    the target alpha for every (V0, D0).
+
+    Returns:
+        dict: 'alpha' (n_v0, n_d0, n_k); 'k_target' (n_v0, n_d0), the
+        interpolated k with alpha = target (NaN where no k on the grid
+        reaches it); 'dalpha_dk' at that k (sensitivity); 'k_closest', the
+        grid k with alpha nearest the target; and the grids.
+    """
+    z = variance_grid() if z is None else np.asarray(z, dtype=float)
+    d0, k, v0 = (np.atleast_1d(np.asarray(x, dtype=float)) for x in (d0, k, v0))
+    if len(k) < 2:
+        raise ValueError("The landscape needs at least two k values.")
+    mask = (z > z_range[0]) & (z < z_range[1])
+    x = np.log1p(z[mask])
+    w = (x - x.mean()) / np.sum((x - x.mean())**2)
+    integrals = diffusion_integrals(k, z)[:, mask] # (n_k, n_fit)
+
+    alpha = np.zeros((len(v0), len(d0), len(k)))
+    for i, v in enumerate(v0):
+        ratio = (d0 / v)[:, None, None]
+        alpha[i] = 0.5 * np.log1p(ratio * integrals[None]) @ w
+
+    # First crossing of the target along k (linear interpolation)
+    slope = np.gradient(alpha, k, axis=-1)
+    above = alpha >= target
+    crossing = above[..., 1:] != above[..., :-1]
+    has = crossing.any(axis=-1)
+    j = np.argmax(crossing, axis=-1)[..., None]
+    jn = np.minimum(j + 1, len(k) - 1)
+    a0 = np.take_along_axis(alpha, j, -1)[..., 0]
+    a1 = np.take_along_axis(alpha, jn, -1)[..., 0]
+    frac = np.where(has, (target - a0) / np.where(has, a1 - a0, 1.0), 0.0)
+    k_target = k[j[..., 0]] + frac * (k[jn[..., 0]] - k[j[..., 0]])
+    s0 = np.take_along_axis(slope, j, -1)[..., 0]
+    s1 = np.take_along_axis(slope, jn, -1)[..., 0]
+    return {
+        'alpha': alpha,
+        'k_target': np.where(has, k_target, np.nan),
+        'dalpha_dk': np.where(has, s0 + frac * (s1 - s0), np.nan),
+        'k_closest': k[np.argmin(np.abs(alpha - target), axis=-1)],
+        'd0': d0,
+        'k': k,
+        'v0': v0,
+    }
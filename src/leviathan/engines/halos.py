@@ -0,0 +1,274 @@
+"""
+Halo Mass Function Engine
+Press-Schechter / Sheth-Tormen abundances and the volume-limited
+"maximum expected mass" against which 'impossible' galaxies are judged.
+"""
+
+import numpy as np
+from scipy.integrate import cumulative_trapezoid, trapezoid
+from astropy.cosmology import Planck18
+import astropy.constants as const
+
+# Critical density today in M_sol / Mpc^3 for h = 1
+RHO_CRIT_H2 = 2.77536627e11
+
+# Spherical collapse threshold
+DELTA_C = 1.686
+
+# Sheth & Tormen (1999) parameters
+ST_A, ST_a, ST_p = 0.3222, 0.707, 0.3
+
+FULL_SKY_DEG2 = 4 * np.pi * np.degrees(1.0)**2
+
+def eisenstein_hu_power(k, cosmology=Planck18):
+    """
+    Linear matter power spectrum (unnormalised) at z=0 using the
+    Eisenstein & Hu (1998) zero-baryon-wiggle transfer function.
+
+    Args:
+        k (array): Wavenumbers in 1/Mpc.
+
+    Returns:
+        array: k^n_s T(k)^2 (normalise to sigma8 separately).
+    """
+    h = cosmology.h
+    om_h2 = cosmology.Om0 * h**2
+    ob_h2 = cosmology.Ob0 * h**2
+    f_b = cosmology.Ob0 / cosmology.Om0
+    theta = cosmology.Tcmb0.value / 2.7
+
+    s = 44.5 * np.log(9.83 / om_h2) / np.sqrt(1 + 10 * ob_h2**0.75) # Mpc
+    alpha_g = 1 - 0.328 * np.log(431 * om_h2) * f_b + 0.38 * np.log(22.3 * om_h2) * f_b**2
+    gamma_eff = om_h2 * (alpha_g + (1 - alpha_g) / (1 + (0.43 * k * s)**4))
+
+    q = k * theta**2 / gamma_eff
+    L0 = np.log(2 * np.e + 1.8 * q)
+    C0 = 14.2 + 731.0 / (1 + 62.5 * q)
+    T = L0 / (L0 + C0 * q**2)
+    return k**cosmology.meta.get('n', 0.9665) * T**2
+
+def _tophat_window(x):
+    """Fourier transform of the real-space top-hat, stable at small x."""
+    x = np.asarray(x, dtype=float)
+    small = x < 1e-3
+    xs = np.where(small, 1.0, x)
+    w = 3 * (np.sin(xs) - xs * np.cos(xs)) / xs**3
+    return np.where(small, 1 - x**2 / 10, w)
+
+class HaloMassFunction:
+    """
+    Tabulates sigma(M), D(z) and n(>M, z) once, then answers abundance and
+    extreme-value queries for any survey geometry by interpolation.
+
+    All masses are in M_sol (no h), lengths in Mpc, volumes in comoving Mpc^3.
+    Survey footprints are sky fractions: f_sky = area_deg2 / FULL_SKY_DEG2.
+    """
+
+    def __init__(self, k=None, pk=None, model='press_schechter', cosmology=Planck18,
+                 sigma8=None, m_min=1e6, m_max=1e17, n_m=400, z_max=30.0, n_z=301):
+        """
+        Args:
+            k, pk (array): Optional tabulated linear P(k) at z=0 (1/Mpc, Mpc^3).
+                Defaults to Eisenstein-Hu normalised to sigma8.
+            model (str): 'press_schechter' or 'sheth_tormen'.
+            sigma8 (float): Normalisation (default: cosmology.meta['sigma8']).
+                Ignored if a tabulated pk is supplied without sigma8.
+            m_min, m_max, n_m: Log-spaced halo mass grid.
+            z_max, n_z: Linear redshift grid.
+        """
+        if model not in ('press_schechter', 'sheth_tormen'):
+            raise ValueError(f"Unknown mass function model: {model}")
+        self.model = model
+        self.cosmology = cosmology
+        self.rho_m = cosmology.Om0 * RHO_CRIT_H2 * cosmology.h**2 # comoving M_sol/Mpc^3
+
+        # 1. Linear power spectrum table
+        if pk is None:
+            k = np.logspace(-5, 3, 2000)
+            pk = eisenstein_hu_power(k, cosmology)
+            if sigma8 is None:
+                sigma8 = cosmology.meta.get('sigma8', 0.81)
+        self.k = np.asarray(k, dtype=float)
+        self.pk = np.asarray(pk, dtype=float)
+        if sigma8 is not None:
+            self.pk = self.pk * (sigma8 / self._sigma_of_radius(8.0 / cosmology.h))**2
+
+        # 2. sigma(M) at z=0 on the mass grid (one (n_m, n_k) quadrature)
+        self.ln_m = np.linspace(np.log(m_min), np.log(m_max), n_m)
+        radius = (3 * np.exp(self.ln_m) / (4 * np.pi * self.rho_m))**(1.0 / 3.0)
+        self.sigma0 = self._sigma_of_radius(radius)
+        self.dlnsigma_dlnm = np.gradient(np.log(self.sigma0), self.ln_m)
+
+        # 3. Growth factor, distances and volumes on the redshift grid
+        self.z = np.linspace(0.0, z_max, n_z)
+        self.growth_z = self._growth(self.z)
+        d_c = cosmology.comoving_distance(self.z).value
+        hubble_distance = const.c.to('km/s').value / cosmology.H0.value
+        dvdz = 4 * np.pi * d_c**2 * hubble_distance / cosmology.efunc(self.z) # full sky
+
+        # 4. n(>M, z) table and its cumulative survey integral over z
+        dndlnm = self._dndlnm_table()
+        tail = cumulative_trapezoid(dndlnm[:, ::-1], -self.ln_m[::-1], axis=1, initial=0)
+        self.n_above_table = tail[:, ::-1] # (n_z, n_m), Mpc^-3
+        self.cum_counts = cumulative_trapezoid(self.n_above_table * dvdz[:, None],
+                                               self.z, axis=0, initial=0) # full-sky N(<z, >M)
+        self.cum_volume = cumulative_trapezoid(dvdz, self.z, initial=0)
+
+    def _sigma_of_radius(self, radius):
+        """sigma(R) at z=0 for an array of top-hat radii (Mpc)."""
+        radius = np.atleast_1d(np.asarray(radius, dtype=float))
+        ln_k = np.log(self.k)
+        integrand = self.k**3 * self.pk * _tophat_window(np.outer(radius, self.k))**2
+        sigma2 = trapezoid(integrand, ln_k, axis=1) / (2 * np.pi**2)
+        return np.sqrt(sigma2)
+
+    def _growth(self, z):
+        """Linear growth factor D(z), normalised to D(0)=1 (Heath 1977 integral)."""
+        ln_a = np.linspace(np.log(1e-5), 0.0, 4000)
+        a = np.exp(ln_a)
+        efunc = self.cosmology.efunc(1 / a - 1)
+        integral = cumulative_trapezoid(a / (a * efunc)**3, ln_a, initial=0)
+        d = efunc * integral
+        d /= d[-1]
+        return np.interp(np.log(1 / (1 + np.asarray(z))), ln_a, d)
+
+    def _multiplicity(self, nu):
+        if self.model == 'press_schechter':
+            return np.sqrt(2 / np.pi) * nu * np.exp(-nu**2 / 2)
+        anu2 = ST_a * nu**2
+        return ST_A * np.sqrt(2 * ST_a / np.pi) * (1 + anu2**-ST_p) * nu * np.exp(-anu2 / 2)
+
+    def _dndlnm_table(self):
+        nu = DELTA_C / (self.growth_z[:, None] * self.sigma0[None, :])
+        return (self.rho_m / np.exp(self.ln_m))[None, :] * self._multiplicity(nu) \
+            * np.abs(self.dlnsigma_dlnm)[None, :]
+
+    def _interp_mass(self, table, mass):
+        """Linear interpolation of table[..., n_m] in ln M along the last axis."""
+        u = (np.log(mass) - self.ln_m[0]) / (self.ln_m[1] - self.ln_m[0])
+        if np.any(u < 0) or np.any(u > len(self.ln_m) - 1):
+            raise ValueError("Mass outside the tabulated range.")
+        idx = np.minimum(u.astype(np.intp), len(self.ln_m) - 2)
+        w = u - idx
+        return table[..., idx] * (1 - w) + table[..., idx + 1] * w
+
+    def _interp_z(self, table, z):
+        """Linear interpolation of table[n_z, ...] along the first axis."""
+        z = np.asarray(z, dtype=float)
+        if np.any(z < 0) or np.any(z > self.z[-1]):
+            raise ValueError("Redshift outside the tabulated range.")
+        u = z / (self.z[1] - self.z[0])
+        idx = np.minimum(u.astype(np.intp), len(self.z) - 2)
+        w = (u - idx).reshape(z.shape + (1,) * (table.ndim - 1))
+        return table[idx] * (1 - w) + table[idx + 1] * w
+
+    def growth(self, z):
+        """Returns the linear growth factor D(z), D(0)=1."""
+        return np.interp(z, self.z, self.growth_z)
+
+    def linear_power(self, k, z=0.0):
+        """Returns the normalised linear P(k, z) in Mpc^3 (log-log interpolated, zero outside)."""
+        k = np.asarray(k, dtype=float)
+        safe = np.where(k > 0, k, self.k[0])
+        pk = np.exp(np.interp(np.log(safe), np.log(self.k), np.log(self.pk), left=-np.inf, right=-np.inf))
+        return np.where(k > 0, pk, 0.0) * self.growth(z)**2
+
+    def sigma(self, mass, z=0.0):
+        """Returns sigma(M, z) = D(z) sigma(M). Broadcasts mass and z."""
+        s0 = np.exp(np.interp(np.log(mass), self.ln_m, np.log(self.sigma0)))
+        return s0 * np.interp(z, self.z, self.growth_z)
+
+    def n_above(self, mass, z):
+        """
+        Cumulative comoving abundance n(>M, z) in Mpc^-3.
+
+        Args:
+            mass (float or array): Halo masses (M_sol).
+            z (float or array): Redshifts.
+
+        Returns:
+            array: (z.shape + mass.shape) grid, e.g. (n_z, n_M).
+        """
+        log_n = np.log(np.maximum(self.n_above_table, 1e-300))
+        per_z = self._interp_z(log_n, z)
+        return np.exp(self._interp_mass(per_z, np.asarray(mass, dtype=float)))
+
+    def survey_volume(self, z_min, z_max, f_sky=1.0):
+        """Comoving volume (Mpc^3) of a shell z_min < z < z_max covering f_sky."""
+        return f_sky * (np.interp(z_max, self.z, self.cum_volume) - np.interp(z_min, self.z, self.cum_volume))
+
+    def _counts_grid(self, z_min, z_max, f_sky):
+        """Expected N(>M) on the mass grid for each geometry: (geom.shape + (n_m,))."""
+        z_min, z_max, f_sky = np.broadcast_arrays(np.asarray(z_min, float),
+                                                  np.asarray(z_max, float),
+                                                  np.asarray(f_sky, float))
+        counts = self._interp_z(self.cum_counts, z_max) - self._interp_z(self.cum_counts, z_min)
+        return np.maximum(counts, 0.0) * f_sky[..., None]
+
+    def expected_count(self, mass, z_min, z_max, f_sky=1.0):
+        """Expected number of halos above `mass` in the survey shell(s)."""
+        return self._interp_mass(self._counts_grid(z_min, z_max, f_sky), np.asarray(mass, dtype=float))
+
+    def max_mass_cdf(self, mass, z_min, z_max, f_sky=1.0):
+        """P(M_max < mass) for Poisson-distributed halos (extreme-value statistics)."""
+        return np.exp(-self.expected_count(mass, z_min, z_max, f_sky))
+
+    def max_expected_mass(self, z_min, z_max, f_sky=1.0, quantile=None):
+        """
+        Mass of the most massive halo expected in the survey volume.
+
+        Args:
+            quantile (float): If None, solves N(>M) = 1. Otherwise returns the
+                quantile of the extreme-value distribution, i.e. solves
+                exp(-N(>M)) = quantile (e.g. 0.5 for the median, 0.99 for the
+                mass exceeded by chance only 1% of the time).
+
+        Returns:
+            array: Halo mass (M_sol) for every geometry (broadcast shape),
+            NaN where even the lightest tabulated halo is too rare.
+        """
+        target = 1.0 if quantile is None else -np.log(quantile)
+        counts = self._counts_grid(z_min, z_max, f_sky)
+        log_n = np.log(np.maximum(counts, 1e-300))
+        log_target = np.log(target)
+
+        # N(>M) decreases along the mass axis: bracket the crossing per geometry
+        above = np.sum(log_n > log_target, axis=-1)
+        lo = np.clip(above - 1, 0, len(self.ln_m) - 2)
+        y0 = np.take_along_axis(log_n, lo[..., None], axis=-1)[..., 0]
+        y1 = np.take_along_axis(log_n, lo[..., None] + 1, axis=-1)[..., 0]
+        w = np.clip((log_target - y0) / np.where(y1 == y0, -1.0, y1 - y0), 0.0, 1.0)
+        ln_m = self.ln_m[lo] + w * (self.ln_m[1] - self.ln_m[0])
+        return np.where(above == 0, np.nan, np.exp(ln_m))
+
+    def max_stellar_mass(self, z_min, z_max, f_sky=1.0, efficiency=1.0, quantile=None):
+        """
+        Stellar-mass ceiling M* = efficiency * f_b * M_halo,max.
+        Geometries and efficiencies broadcast, so a sweep is one call.
+        """
+        f_b = self.cosmology.Ob0 / self.cosmology.Om0
+        m_halo = self.max_expected_mass(z_min, z_max, f_sky, quantile)
+        return np.asarray(efficiency) * f_b * m_halo
+
+    def exclusion_probability(self, log_mstar, z_min, z_max, f_sky=1.0, efficiency=1.0):
+        """
+        Probability that the survey contains at least one halo able to host
+        a galaxy of stellar mass 10^log_mstar. Small values mean 'impossible'.
+        """
+        f_b = self.cosmology.Ob0 / self.cosmology.Om0
+        m_halo = 10**np.asarray(log_mstar, dtype=float) / (np.asarray(efficiency) * f_b)
+        m_halo = np.clip(m_halo, np.exp(self.ln_m[0]), np.exp(self.ln_m[-1]))
+        counts = self._counts_grid(z_min, z_max, f_sky)
+        return 1.0 - np.exp(-self._interp_broadcast_mass(counts, m_halo))
+
+    def _interp_broadcast_mass(self, counts, mass):
+        """Elementwise interpolation where counts and mass share leading shape."""
+        u = (np.log(mass) - self.ln_m[0]) / (self.ln_m[1] - self.ln_m[0])
+        idx = np.minimum(u.astype(np.intp), len(self.ln_m) - 2)
+        shape = np.broadcast_shapes(counts.shape[:-1], idx.shape)
+        counts = np.broadcast_to(counts, shape + counts.shape[-1:])
+        w = np.broadcast_to(u - idx, shape)
+        idx = np.broadcast_to(idx, shape)[..., None]
+        c0 = np.take_along_axis(counts, idx, axis=-1)[..., 0]
+        c1 = np.take_along_axis(counts, idx + 1, axis=-1)[..., 0]
+        return c0 * (1 - w) + c1 * w
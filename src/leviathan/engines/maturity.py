@@ -0,0 +1,177 @@
+"""
+Maturity-Ratio Engine
+Propagates catalogue uncertainties (z, stellar mass, SED age) through the
+chronometry engine by Monte Carlo, for catalogues of any size.
+"""
+
+import numpy as np
+from leviathan.engines import chronometry
+
+# Catalogue column names (override with the `columns` argument).
+# Error columns are optional; a missing error column means "no scatter".
+DEFAULT_COLUMNS = {
+    'id': 'id',
+    'z': 'z',
+    'z_err': 'z_err',
+    'mass': 'mass',          # log10 M_sol
+    'mass_err': 'mass_err',  # dex
+    'age': 'age',            # Gyr (SED / structural age estimate)
+    'age_err': 'age_err',    # Gyr
+}
+
+# Percentiles reported for every posterior (median and 1-sigma interval)
+QUANTILES = (0.16, 0.5, 0.84)
+
+# Elements (objects x draws) evaluated per batch; bounds peak memory
+BATCH_ELEMENTS = 2_000_000
+
+# Floors applied to the draws so that unphysical tails stay finite
+Z_FLOOR = 1e-4
+AGE_FLOOR = 1e-6 # Gyr
+
+def load_catalogue(catalogue, columns=None):
+    """
+    Extracts the audit columns from any columnar catalogue.
+
+    Args:
+        catalogue: Anything indexable by column name (dict of arrays,
+            pandas DataFrame, astropy Table, FITS_rec).
+        columns (dict): Overrides for DEFAULT_COLUMNS.
+
+    Returns:
+        dict: Float arrays 'z', 'z_err', 'mass', 'mass_err', 'age', 'age_err'
+        and the 'id' column (or a running index).
+    """
+    names = dict(DEFAULT_COLUMNS)
+    if columns:
+        names.update(columns)
+
+    def _column(key, required=True):
+        try:
+            return np.asarray(catalogue[names[key]])
+        except (KeyError, ValueError, IndexError):
+            if required:
+                raise KeyError(f"Catalogue is missing the '{names[key]}' column.")
+            return None
+
+    cat = {key: _column(key).astype(float) for key in ('z', 'mass', 'age')}
+    n = len(cat['z'])
+    for key in ('z_err', 'mass_err', 'age_err'):
+        err = _column(key, required=False)
+        cat[key] = np.zeros(n) if err is None else np.abs(err.astype(float))
+
+    ids = _column('id', required=False)
+    cat['id'] = np.arange(n) if ids is None else ids
+    return cat
+
+def _row_quantiles(samples, quantiles=QUANTILES):
+    """
+    Linear-interpolated quantiles of every row (NaN for rows holding a NaN).
+
+    One in-place partition along the contiguous draw axis with all needed
+    order statistics at once (np.quantile moves the axis and copies first).
+    """
+    n = samples.shape[1]
+    pos = np.asarray(quantiles) * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    bad = np.isnan(samples).any(axis=1)
+    samples.partition(np.unique(np.concatenate((lo, hi))), axis=1)
+    frac = pos - lo
+    q = samples[:, lo] * (1 - frac) + samples[:, hi] * frac
+    q[bad] = np.nan
+    return q
+
+def _summarise(samples):
+    """Returns (n_obj, len(QUANTILES)) percentiles and the P(value > 1) column."""
+    p_exceed = np.mean(samples > 1.0, axis=1)
+    q = _row_quantiles(samples)
+    return q, np.where(np.isnan(q[:, 1]), np.nan, p_exceed)
+
+def run_maturity_audit(catalogue, alpha=0.0, n_draws=1000, seed=None, columns=None):
+    """
+    Computes Monte Carlo posteriors of the maturity ratio for every object.
+
+    For each realisation:
+        R_coord  = age / t(z)          (Maturity Ratio vs. coordinate age)
+        R_struct = age / tau(z, alpha) (Tension Factor vs. structural age)
+        log_sfr  = mass - log10(t(z) [yr])  (mean SFR needed, log10 M_sol/yr)
+
+    Objects are processed in batches of BATCH_ELEMENTS draws, each batch as
+    one (n_obj, n_draws) array operation. The cost is linear in n_obj x
+    n_draws (about 26 s for 1e5 objects x 1000 draws on one core, split
+    roughly evenly between the random draws, the per-row percentile
+    partitions and the t(z) / tau evaluations).
+
+    Args:
+        catalogue: Columnar catalogue (see load_catalogue).
+        alpha (float): Temporal density exponent for the structural age.
+        n_draws (int): Monte Carlo realisations per object.
+        seed (int): Optional seed for reproducibility.
+        columns (dict): Column name overrides.
+
+    Returns:
+        (dict, dict): Per-object summaries and the population summary.
+            Per-object arrays 'coord_q' / 'struct_q' / 'log_sfr_q' have shape
+            (n_obj, 3) for the 16th/50th/84th percentiles; 'p_coord' and
+            'p_struct' are the posterior probabilities of a ratio > 1.
+            Objects without a redshift (NaN) get NaN summaries and are left
+            out of the population summary.
+    """
+    if n_draws < 1:
+        raise ValueError(f"n_draws must be at least 1 (got {n_draws}).")
+    cat = load_catalogue(catalogue, columns)
+    rng = np.random.default_rng(seed)
+    n_obj = len(cat['z'])
+
+    per_object = {
+        'id': cat['id'],
+        'z': cat['z'],
+        'coord_q': np.empty((n_obj, len(QUANTILES))),
+        'struct_q': np.empty((n_obj, len(QUANTILES))),
+        'log_sfr_q': np.empty((n_obj, len(QUANTILES))),
+        'p_coord': np.empty(n_obj),
+        'p_struct': np.empty(n_obj),
+    }
+    # Population posterior: number of violating objects in each realisation
+    n_violating = np.zeros(n_draws, dtype=np.int64)
+
+    batch = max(1, BATCH_ELEMENTS // n_draws)
+    for start in range(0, n_obj, batch):
+        sl = slice(start, min(start + batch, n_obj))
+        shape = (sl.stop - sl.start, n_draws)
+
+        # 1. Draw realisations
+        z = cat['z'][sl, None] + cat['z_err'][sl, None] * rng.standard_normal(shape)
+        np.maximum(z, Z_FLOOR, out=z)
+        age = cat['age'][sl, None] + cat['age_err'][sl, None] * rng.standard_normal(shape)
+        np.maximum(age, AGE_FLOOR, out=age)
+        mass = cat['mass'][sl, None] + cat['mass_err'][sl, None] * rng.standard_normal(shape)
+
+        # 2. Available time (one vectorised chronometry call each)
+        t_coord = chronometry.get_coord_age(z)
+        tau = chronometry.structural_age_from_coord_age(t_coord, alpha=alpha)
+
+        # 3. Posteriors
+        r_coord = age / t_coord
+        r_struct = age / tau
+        log_sfr = mass - np.log10(t_coord * 1e9)
+
+        n_violating += np.sum(r_coord > 1.0, axis=0)
+        # (the summaries partition each sample array in place)
+        per_object['coord_q'][sl], per_object['p_coord'][sl] = _summarise(r_coord)
+        per_object['struct_q'][sl], per_object['p_struct'][sl] = _summarise(r_struct)
+        per_object['log_sfr_q'][sl] = _row_quantiles(log_sfr)
+
+    population = {
+        'n_objects': n_obj,
+        'n_draws': n_draws,
+        'alpha': alpha,
+        'expected_violations': float(np.nansum(per_object['p_coord'])),
+        'violations_q': np.quantile(n_violating, QUANTILES),
+        'n_confident_coord': int(np.sum(per_object['p_coord'] > 0.95)),
+        'n_confident_struct': int(np.sum(per_object['p_struct'] > 0.95)),
+        'median_coord_ratio': float(np.nanmedian(per_object['coord_q'][:, 1])) if n_obj else np.nan,
+        'median_struct_ratio': float(np.nanmedian(per_object['struct_q'][:, 1])) if n_obj else np.nan,
+    }
+    return per_object, population
@@ -1,7 +1,13 @@
 import numpy as np
-from scipy.spatial import cKDTree
+from scipy.spatial import cKDTree, ConvexHull, QhullError
+from scipy.spatial.distance import pdist
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 import networkx as nx
 
+# Groups up to this size get an exact brute-force diameter (no hull needed)
+BRUTE_FORCE_EXTENT = 64
+
 def build_structure_graph(positions, linking_length):
     """
     Converts a point cloud (Quasars) into a graph using Friends-of-Friends.
@@ -41,16 +47,57 @@ def measure_extent(subgraph, positions):
     Measures the maximum physical distance between any two points in the cluster.
     """
     nodes = list(subgraph.nodes())
-    coords = positions[nodes]
-    
-    # Brute force max distance (okay for small clusters, optimized for large)
-    # We use the Convex Hull diameter for speed
-    from scipy.spatial import ConvexHull, distance_matrix
-    
-    if len(coords) < 3:
-        return np.max(distance_matrix(coords, coords))
-        
-    hull = ConvexHull(coords)
-    hull_points = coords[hull.vertices]
-    dists = distance_matrix(hull_points, hull_points)
-    return np.max(dists)
+    return group_extent(positions, nodes)
+
+def fof_labels(positions, linking_length, tree=None):
+    """
+    Friends-of-Friends group labels, without building a NetworkX graph.
+    positions: (N, 3) array of XYZ coordinates (Mpc)
+    linking_length: Max distance to link two nodes (Mpc)
+    tree: Optional prebuilt cKDTree of positions (reused, not rebuilt)
+
+    Returns: (N,) integer group label per point (labels are 0..n_groups-1)
+    """
+    if tree is None:
+        tree = cKDTree(positions)
+    pairs = tree.query_pairs(r=linking_length, output_type='ndarray')
+    return labels_from_pairs(pairs, len(positions))
+
+def labels_from_pairs(pairs, n):
+    """Connected-component labels of n nodes linked by an (M, 2) pair array."""
+    adjacency = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+                           shape=(n, n))
+    _, labels = connected_components(adjacency, directed=False)
+    return labels
+
+def largest_group(labels):
+    """
+    Returns (size, member indices) of the largest FoF group.
+    """
+    if len(labels) == 0:
+        return 0, np.empty(0, dtype=np.intp)
+    sizes = np.bincount(labels)
+    best = np.argmax(sizes)
+    return sizes[best], np.flatnonzero(labels == best)
+
+def hull_points(coords):
+    """
+    Returns the subset of coords that can realise the diameter (hull vertices).
+    """
+    if len(coords) <= BRUTE_FORCE_EXTENT:
+        return coords
+    try:
+        return coords[ConvexHull(coords).vertices]
+    except QhullError:
+        # Degenerate (e.g. coplanar) groups: fall back to all points
+        return coords
+
+def group_extent(positions, members):
+    """
+    Maximum physical distance between any two members of a group.
+    positions: (N, 3) array; members: index array (or list) into positions
+    """
+    coords = np.asarray(positions)[np.asarray(members, dtype=np.intp)]
+    if len(coords) < 2:
+        return 0.0
+    return float(np.max(pdist(hull_points(coords))))
@@ -0,0 +1,254 @@
+"""
+3D Void Finder
+Watershed segmentation of the smoothed tracer density contrast on a mesh.
+
+Every underdense local minimum seeds a basin; basins are grown by
+scipy.ndimage.watershed_ift and each void is the part of its basin below
+the wall density.
+The mesh is cut into blocks that are segmented in parallel, each padded by
+a guard zone; a void belongs to the block holding its minimum. A void that
+reaches the edge of its padded block may be truncated, so its block is
+segmented again with twice the guard until the void fits (or the padding
+spans the mesh). Voids then match a single-volume segmentation up to the
+watershed's tie-breaking between basins of equal flooding level.
+"""
+
+import numpy as np
+import healpy as hp
+from scipy import ndimage
+from leviathan import ingestion, parallel
+from leviathan.engines import density
+
+# Blocks per mesh axis for the domain decomposition
+N_BLOCKS = 4
+
+# Quantisation levels of the watershed input (watershed_ift needs uint16)
+N_LEVELS = 65535
+
+# Expected count per cell below which a cell is outside the survey
+MIN_EXPECTED = 0.1
+
+# Default density contrast bounding a void: cells at or above it are walls.
+# Slightly overdense, so a void extends up to its compensation ridge
+# instead of stopping at the mean density.
+WALL_THRESHOLD = 0.2
+
+# Typical void radius (Mpc) used to size the default guard zone
+VOID_RADIUS = 30.0
+
+def density_contrast(data, randoms, mesh, smoothing=None, scheme='cic',
+                     data_weights=None, random_weights=None):
+    """
+    Smoothed density contrast of a catalogue on a mesh.
+
+    Args:
+        data, randoms (array): (N, 3) comoving positions (Mpc). Randoms set
+            the expected counts (survey footprint and n(z)).
+        mesh (density.Mesh): Mesh geometry (e.g. Mesh.enclosing(randoms)).
+        smoothing (float): Gaussian smoothing scale (Mpc), default 2 cells.
+
+    Returns:
+        (array, array): delta on the mesh and the boolean survey mask.
+    """
+    smoothing = 2 * mesh.cell if smoothing is None else smoothing
+    sigma = smoothing / mesh.cell
+    n_data = density.assign(data, mesh, data_weights, scheme)
+    n_rand = density.assign(randoms, mesh, random_weights, scheme)
+    alpha = n_data.sum() / n_rand.sum()
+
+    n_data = ndimage.gaussian_filter(n_data, sigma, mode='constant')
+    expected = ndimage.gaussian_filter(n_rand, sigma, mode='constant') * alpha
+    inside = expected > MIN_EXPECTED
+    delta = np.zeros(mesh.shape, dtype=np.float32)
+    delta[inside] = n_data[inside] / expected[inside] - 1.0
+    return delta, inside
+
+def _pad(core, shape, guard):
+    """Core slices grown by guard cells (clipped to the mesh)."""
+    return tuple(slice(max(0, s.start - guard), min(n, s.stop + guard)) for s, n in zip(core, shape))
+
+def _blocks(shape, n_blocks):
+    """Core slice triples for every block of the mesh."""
+    edges = [np.linspace(0, n, n_blocks + 1).astype(int) for n in shape]
+    return [tuple(slice(e[b], e[b + 1]) for e, b in zip(edges, (i, j, k)))
+            for i in range(n_blocks) for j in range(n_blocks) for k in range(n_blocks)]
+
+def segment_block(delta, inside, offset, core, core_threshold=0.0, wall_threshold=WALL_THRESHOLD,
+                  shape=None, delta_range=None):
+    """
+    Watershed of one (padded) block.
+
+    Args:
+        delta, inside (array): Block of the density contrast and survey mask.
+        offset (tuple): Mesh index of the block's first cell.
+        core (tuple): Core slices in mesh indices; only minima inside the
+            core are reported.
+        core_threshold (float): Maximum central delta of a void.
+        wall_threshold (float): Cells at or above this delta are walls and
+            belong to no void.
+        shape (tuple): Full mesh shape (default: the block is the mesh).
+            Block faces inside the mesh are where voids can be truncated.
+        delta_range (tuple): (min, max) delta for the quantisation (default:
+            the block's own range; pass the mesh range so blocks agree).
+
+    Returns:
+        list: One dict per void with mesh-index 'minimum', 'delta_min',
+        'delta_mean', 'n_cells', the cell-weighted 'centre' (mesh units) and
+        'truncated' (the void reaches a block face inside the mesh).
+    """
+    shape = delta.shape if shape is None else shape
+    # 1. Markers: underdense local minima (flat plateaus merged into one
+    #    marker) inside the survey; cells outside the survey = -1
+    minima = (delta == ndimage.minimum_filter(delta, size=3, mode='nearest')) \
+        & inside & (delta < core_threshold)
+    # Block faces inside the mesh lack neighbours, so minima there are spurious
+    for d in range(3):
+        if offset[d] > 0:
+            minima[(slice(None),) * d + (0,)] = False
+        if offset[d] + delta.shape[d] < shape[d]:
+            minima[(slice(None),) * d + (-1,)] = False
+    markers, n_seeds = ndimage.label(minima)
+    if n_seeds == 0:
+        return []
+    markers = markers.astype(np.int32)
+    markers[~inside] = -1
+    seeds = np.ravel_multi_index(
+        np.array(ndimage.minimum_position(delta, markers, np.arange(1, n_seeds + 1))).T, delta.shape)
+
+    # 2. Flood the quantised field (low density = early)
+    lo, hi = (delta[inside].min(), delta[inside].max()) if delta_range is None else delta_range
+    levels = np.zeros(delta.shape, dtype=np.uint16)
+    levels[inside] = np.round((delta[inside] - lo) / max(hi - lo, 1e-12) * (N_LEVELS - 1))
+    levels[~inside] = N_LEVELS
+    zones = ndimage.watershed_ift(levels, markers)
+
+    # 3. Zone properties (underdense cells inside the survey only)
+    zones = np.where(inside & (zones > 0) & (delta < wall_threshold), zones, 0)
+    n_zone = n_seeds + 1
+    flat = zones.ravel()
+    n_cells = np.bincount(flat, minlength=n_zone)
+    sum_delta = np.bincount(flat, weights=delta.ravel(), minlength=n_zone)
+    grid = np.indices(delta.shape).reshape(3, -1)
+    centre = np.array([np.bincount(flat, weights=g, minlength=n_zone) for g in grid]).T
+
+    # Zones touching a block face that is not a mesh face
+    truncated = np.zeros(n_zone, dtype=bool)
+    for d in range(3):
+        if offset[d] > 0:
+            truncated[np.take(zones, 0, axis=d)] = True
+        if offset[d] + delta.shape[d] < shape[d]:
+            truncated[np.take(zones, -1, axis=d)] = True
+
+    seed_idx = np.column_stack(np.unravel_index(seeds, delta.shape)) + np.asarray(offset)
+    in_core = np.all([(seed_idx[:, d] >= core[d].start) & (seed_idx[:, d] < core[d].stop)
+                      for d in range(3)], axis=0)
+
+    voids = []
+    for label in np.flatnonzero(in_core) + 1:
+        if n_cells[label] == 0:
+            continue
+        voids.append({
+            'minimum': seed_idx[label - 1],
+            'delta_min': float(delta.flat[seeds[label - 1]]),
+            'delta_mean': sum_delta[label] / n_cells[label],
+            'n_cells': int(n_cells[label]),
+            'centre': centre[label] / n_cells[label] + np.asarray(offset),
+            'truncated': bool(truncated[label]),
+        })
+    return voids
+
+def find_voids(data, randoms, mesh=None, n_grid=256, smoothing=None, core_threshold=-0.3,
+               wall_threshold=WALL_THRESHOLD, min_radius=None, guard=None, n_blocks=N_BLOCKS,
+               n_workers=None):
+    """
+    Finds voids in a tracer catalogue.
+
+    Args:
+        data, randoms (array): (N, 3) comoving positions (Mpc).
+        mesh (density.Mesh): Mesh geometry (default: enclosing the randoms
+            with n_grid cells on the longest side).
+        smoothing (float): Gaussian smoothing scale (Mpc), default 2 cells.
+        core_threshold (float): Maximum central density contrast.
+        wall_threshold (float): Density contrast bounding each void.
+        min_radius (float): Minimum effective radius (Mpc), default 2 cells.
+        guard (int): Initial guard zone in cells (default: one diameter of
+            a VOID_RADIUS or min_radius void); blocks with truncated voids
+            are re-segmented with a doubled guard.
+        n_blocks (int): Blocks per axis (n_blocks^3 parallel tasks).
+        n_workers (int): Worker processes (default: all cores).
+
+    Returns:
+        dict: Arrays per void: 'centre' (N, 3) and effective 'radius' (Mpc),
+        'volume' (Mpc^3), 'delta_min', 'delta_mean', plus 'ra', 'dec', 'z',
+        Galactic 'glon'/'glat' (deg) and 'radius_deg' for the sky-profile code.
+    """
+    mesh = density.Mesh.enclosing(randoms, n_grid) if mesh is None else mesh
+    print(f"-> Density contrast on a {mesh.shape} mesh ({mesh.cell:.1f} Mpc cells)...")
+    delta, inside = density_contrast(data, randoms, mesh, smoothing)
+
+    min_radius = 2 * mesh.cell if min_radius is None else min_radius
+    guard = guard or max(2, int(np.ceil(2 * max(VOID_RADIUS, min_radius) / mesh.cell)))
+
+    delta_range = (float(delta[inside].min()), float(delta[inside].max()))
+
+    # Segment every block; blocks with truncated voids are redone with a
+    # doubled guard, keeping only the voids that were truncated before
+    voids = []
+    pending = [(core, None) for core in _blocks(mesh.shape, n_blocks)]
+    while pending:
+        tasks = []
+        for core, _ in pending:
+            padded = _pad(core, mesh.shape, guard)
+            offset = tuple(s.start for s in padded)
+            tasks.append((delta[padded], inside[padded], offset, core, core_threshold,
+                          wall_threshold, mesh.shape, delta_range))
+        print(f"-> Watershed on {len(tasks)} blocks (guard {guard} cells)...")
+        results = parallel.map_tasks(_segment_task, tasks, n_workers=n_workers)
+        retry = []
+        for (core, wanted), block in zip(pending, results):
+            if wanted is not None:
+                block = [v for v in block if tuple(v['minimum']) in wanted]
+            voids += [v for v in block if not v['truncated']]
+            cut = {tuple(v['minimum']) for v in block if v['truncated']}
+            if cut:
+                retry.append((core, cut))
+        pending = retry
+        guard *= 2
+
+    volume = np.array([v['n_cells'] for v in voids], dtype=float) * mesh.cell**3
+    radius = (3 * volume / (4 * np.pi))**(1 / 3)
+    keep = radius >= min_radius
+    centre = mesh.origin + (np.array([v['centre'] for v in voids]).reshape(-1, 3) + 0.5) * mesh.cell
+    catalogue = {
+        'centre': centre[keep],
+        'radius': radius[keep],
+        'volume': volume[keep],
+        'delta_min': np.array([v['delta_min'] for v in voids])[keep],
+        'delta_mean': np.array([v['delta_mean'] for v in voids])[keep],
+    }
+    catalogue.update(sky_coordinates(catalogue['centre'], catalogue['radius']))
+    print(f"-> Found {np.sum(keep)} voids (R_eff >= {min_radius:.1f} Mpc).")
+    return catalogue
+
+def sky_coordinates(centres, radii):
+    """
+    Sky position and angular size of 3D voids.
+
+    Returns:
+        dict: 'ra', 'dec', 'glon', 'glat' and 'radius_deg' (deg) and 'z'.
+    """
+    centres = np.asarray(centres, dtype=float).reshape(-1, 3)
+    dist = np.linalg.norm(centres, axis=1)
+    theta, phi = hp.vec2ang(centres)
+    g_theta, g_phi = hp.Rotator(coord=['C', 'G'])(theta, phi)
+    return {
+        'ra': np.degrees(phi) % 360,
+        'dec': 90 - np.degrees(theta),
+        'glon': np.degrees(g_phi) % 360,
+        'glat': 90 - np.degrees(g_theta),
+        'radius_deg': np.degrees(np.arctan2(radii, dist)),
+        'z': ingestion.distance_to_redshift(dist),
+    }
+
+def _segment_task(task):
+    return segment_block(*task)
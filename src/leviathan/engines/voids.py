@@ -19,3 +19,21 @@ def calculate_void_significance(observed_temp, null_mean, null_std):
     Returns the sigma-deviation of the void from Gaussian noise.
     """
     return (observed_temp - null_mean) / null_std
+
+def get_catalogue_profiles(map_data, catalogue, frame='galactic'):
+    """
+    Runs get_void_profile on every void of a 3D catalogue
+    (engines.void_finder.find_voids), using its angular radius.
+
+    Args:
+        frame (str): 'galactic' (glon/glat, e.g. Planck maps) or
+            'equatorial' (ra/dec) to match the map coordinates.
+
+    Returns:
+        (array, array): Mean and standard deviation of the map in each disc.
+    """
+    lon, lat = (catalogue['glon'], catalogue['glat']) if frame == 'galactic' \
+        else (catalogue['ra'], catalogue['dec'])
+    profiles = np.array([get_void_profile(map_data, lo, la, r)
+                         for lo, la, r in zip(lon, lat, catalogue['radius_deg'])]).reshape(-1, 2)
+    return profiles[:, 0], profiles[:, 1]
@@ -0,0 +1,525 @@
+"""
+Euclid Q1 Ingestion
+Keeps an indexed local manifest of the IRSA S3 bucket (paginated listing
+fanned out over tile prefixes), resolves MER / PHZ catalogue keys for any
+list of tiles from it and mirrors them with one pooled client: files and
+byte ranges download concurrently, interrupted transfers resume, and every
+object is verified (size + ETag) and stored once in a content-addressed
+local mirror.
+
+Set LEVIATHAN_S3_ENDPOINT (or pass endpoint_url) to point at a local S3
+stand-in such as moto or MinIO.
+"""
+
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import boto3
+from astropy.io import fits
+from botocore import UNSIGNED
+from botocore.client import Config
+from leviathan import pipeline
+
+BUCKET_NAME = 'nasa-irsa-euclid-q1'
+REGION = 'us-east-1'
+CATALOG_PREFIX = 'q1/catalogs'
+
+# Product -> (directory under CATALOG_PREFIX, file-name pattern)
+PRODUCTS = {
+    'MER': ('MER_FINAL_CATALOG', re.compile(r'EUC_MER_FINAL-CAT_.*\.fits$')),
+    'PHZ': ('PHZ_PF_OUTPUT_FOR_L3', re.compile(r'EUC_PHZ_PHYSPARAM__.*\.fits$')),
+}
+
+# Friendly per-tile names in RAW_DIR (used by the audit scripts)
+TILE_NAMES = {
+    'MER': 'EUC_MER_FINAL-CAT_TILE{tile}.fits',
+    'PHZ': 'EUC_PHZ_PHYSPARAM_TILE{tile}.fits',
+}
+
+RAW_DIR = 'data/raw/euclid'
+MIRROR_DIR = os.path.join(RAW_DIR, 'mirror')
+MANIFEST_PATH = os.path.join(RAW_DIR, 'manifest.sqlite')
+
+# Transfer tuning: byte-range size and concurrent requests
+PART_SIZE = 8 * 1024**2
+N_WORKERS = 16
+
+# Part sizes tried when checking multipart ETags (MiB)
+MULTIPART_SIZES_MB = (8, 16, 5, 32, 64, 100)
+
+# Catalogue reader: join key, PHZ point redshift, rows per predicate chunk
+ID_COLUMN = 'OBJECT_ID'
+Z_COLUMN = 'PHZ_PP_MEDIAN_REDSHIFT'
+READ_CHUNK_ROWS = 1_000_000
+
+@lru_cache(maxsize=None)
+def get_client(endpoint_url=None, max_connections=N_WORKERS):
+    """
+    Returns a shared, thread-safe S3 client (anonymous unless a custom
+    endpoint is used).
+    """
+    endpoint_url = endpoint_url or os.environ.get('LEVIATHAN_S3_ENDPOINT')
+    config = Config(max_pool_connections=max_connections, retries={'max_attempts': 10, 'mode': 'adaptive'},
+                    signature_version=None if endpoint_url else UNSIGNED)
+    return boto3.client('s3', region_name=REGION, endpoint_url=endpoint_url, config=config)
+
+# --- MANIFEST ---
+
+def list_directories(prefix, client=None):
+    """Sub-directories ('common prefixes') under a prefix, all pages."""
+    client = client or get_client()
+    out = []
+    for page in client.get_paginator('list_objects_v2').paginate(Bucket=BUCKET_NAME, Prefix=prefix, Delimiter='/'):
+        out.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+    return sorted(set(out))
+
+def list_objects(prefix, client=None):
+    """Every object under a prefix (follows continuation tokens)."""
+    client = client or get_client()
+    out = []
+    for page in client.get_paginator('list_objects_v2').paginate(Bucket=BUCKET_NAME, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            out.append({'key': obj['Key'], 'size': obj['Size'], 'etag': obj['ETag'].strip('"'),
+                        'last_modified': obj['LastModified'].isoformat()})
+    return out
+
+class Manifest:
+    """
+    Local, indexed copy of the bucket layout <root>/<product>/<tile>/<file>.
+
+    Listing fans out over tile prefixes on a thread pool; every tile prefix
+    that has been listed is recorded, so an incremental refresh only lists
+    tiles that appeared since. Lookups are SQLite queries. Close it (or use
+    it as a context manager) to release the database connection.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or MANIFEST_PATH
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                key TEXT PRIMARY KEY, tile TEXT, product TEXT,
+                size INTEGER, etag TEXT, last_modified TEXT);
+            CREATE INDEX IF NOT EXISTS objects_tile_product ON objects (tile, product);
+            CREATE TABLE IF NOT EXISTS listed (
+                prefix TEXT PRIMARY KEY, listed_at TEXT);
+        """)
+
+    def close(self):
+        """Closes the SQLite connection."""
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _listed(self):
+        return {row[0] for row in self.db.execute("SELECT prefix FROM listed")}
+
+    def refresh(self, root=CATALOG_PREFIX, products=None, tiles=None, full=False,
+                n_workers=N_WORKERS, endpoint_url=None):
+        """
+        Brings the manifest up to date.
+
+        Args:
+            root (str): Prefix holding product directories.
+            products (list): Product directory names (default: all under root).
+            tiles (list): Tile IDs to list (default: every tile directory).
+            full (bool): Re-list tiles that are already in the manifest.
+
+        Returns:
+            int: Number of tile prefixes listed.
+        """
+        client = get_client(endpoint_url, n_workers)
+        root = root.rstrip('/') + '/'
+        if products is None:
+            products = [p[len(root):].strip('/') for p in list_directories(root, client)]
+
+        if tiles is None:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                found = pool.map(lambda p: list_directories(f"{root}{p}/", client), products)
+                prefixes = [d for dirs in found for d in dirs]
+        else:
+            prefixes = [f"{root}{p}/{t}/" for p in products for t in tiles]
+        if not full:
+            listed = self._listed()
+            prefixes = [p for p in prefixes if p not in listed]
+        if not prefixes:
+            return 0
+
+        print(f"-> Listing {len(prefixes)} tile prefixes under {root}...")
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            listings = list(pool.map(lambda p: list_objects(p, client), prefixes))
+
+        now = datetime.now(timezone.utc).isoformat()
+        with self.db:
+            for prefix, objects in zip(prefixes, listings):
+                product, tile = prefix[len(root):].strip('/').split('/')[-2:]
+                # Replace the tile's rows so deleted keys disappear
+                self.db.execute("DELETE FROM objects WHERE key >= ? AND key < ?", (prefix, prefix + '\uffff'))
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)",
+                    [(o['key'], tile, product, o['size'], o['etag'], o['last_modified']) for o in objects])
+                self.db.execute("INSERT OR REPLACE INTO listed VALUES (?, ?)", (prefix, now))
+        return len(prefixes)
+
+    def has_tile(self, tile, product, root=CATALOG_PREFIX):
+        """Whether a product directory of a tile has been listed."""
+        prefix = f"{root.rstrip('/')}/{product}/{tile}/"
+        return self.db.execute("SELECT 1 FROM listed WHERE prefix = ?", (prefix,)).fetchone() is not None
+
+    def tiles(self, product=None):
+        """Tile IDs in the manifest (optionally of one product)."""
+        query, args = "SELECT DISTINCT tile FROM objects", ()
+        if product:
+            query, args = query + " WHERE product = ?", (product,)
+        return [row[0] for row in self.db.execute(query + " ORDER BY tile", args)]
+
+    def objects(self, tile=None, product=None):
+        """Manifest rows as dicts, filtered by tile and/or product directory."""
+        clauses, args = [], []
+        for column, value in (('tile', tile), ('product', product)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(str(value))
+        query = "SELECT key, tile, product, size, etag, last_modified FROM objects"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        columns = ('key', 'tile', 'product', 'size', 'etag', 'last_modified')
+        return [dict(zip(columns, row)) for row in self.db.execute(query + " ORDER BY key", args)]
+
+    def summary(self):
+        """(product, n_tiles, n_objects, total bytes) per product."""
+        return self.db.execute("""
+            SELECT product, COUNT(DISTINCT tile), COUNT(*), SUM(size)
+            FROM objects GROUP BY product ORDER BY product""").fetchall()
+
+    def lookup(self, tile, product):
+        """Newest file of a PRODUCTS entry ('MER', 'PHZ') for a tile, or None."""
+        directory, pattern = PRODUCTS[product]
+        matches = [o for o in self.objects(tile, directory) if pattern.search(o['key'])]
+        # Processing timestamps in the names sort lexically
+        return max(matches, key=lambda o: o['key']) if matches else None
+
+def resolve(tiles, products=('MER', 'PHZ'), refresh=False, endpoint_url=None):
+    """
+    Resolves product keys for tiles from the manifest, listing only tiles
+    it has not seen yet (or all of them with refresh).
+
+    Returns:
+        list: Dicts with 'tile', 'product', 'key', 'size' and 'etag'.
+    """
+    tiles = [str(t) for t in tiles]
+    out = []
+    with Manifest() as manifest:
+        for p in products:
+            directory = PRODUCTS[p][0]
+            todo = tiles if refresh else [t for t in tiles if not manifest.has_tile(t, directory)]
+            if todo:
+                manifest.refresh(products=[directory], tiles=todo, full=True, endpoint_url=endpoint_url)
+
+        for t in tiles:
+            for p in products:
+                entry = manifest.lookup(t, p)
+                if entry is None:
+                    print(f"-> WARNING: No {p} product found for tile {t}.")
+                    continue
+                out.append(dict(entry, tile=t, product=p))
+    return out
+
+# --- VERIFICATION ---
+
+def _md5_parts(path, part_size):
+    digests = []
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(part_size), b''):
+            digests.append(hashlib.md5(block).digest())
+    return digests
+
+def verify(path, size, etag):
+    """
+    Checks a local file against the S3 size and ETag (plain MD5, or the
+    MD5-of-part-MD5s form for multipart uploads).
+    """
+    if os.path.getsize(path) != size:
+        return False
+    if '-' not in etag:
+        return _file_md5(path) == etag
+    digest, n_parts = etag.split('-')
+    sizes = [mb * 1024**2 for mb in MULTIPART_SIZES_MB]
+    sizes.append(-(-size // int(n_parts) // 1024**2) * 1024**2) # ceil(size / n) in whole MiB
+    for part_size in sizes:
+        parts = _md5_parts(path, part_size)
+        if len(parts) == int(n_parts) and hashlib.md5(b''.join(parts)).hexdigest() == digest:
+            return True
+    return False
+
+def _file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(8 * 1024**2), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+# --- MIRROR ---
+
+def mirror_path(etag):
+    """Content-addressed location of an object (by ETag)."""
+    name = etag.replace('-', '_')
+    return os.path.join(MIRROR_DIR, 'objects', name[:2], name)
+
+def _link(target, link):
+    """Hard-links a mirrored object under a readable name (copy-free)."""
+    os.makedirs(os.path.dirname(link) or '.', exist_ok=True)
+    if os.path.exists(link):
+        if os.path.samefile(target, link):
+            return
+        os.remove(link)
+    try:
+        os.link(target, link)
+    except OSError:
+        os.symlink(os.path.abspath(target), link)
+
+class _Transfer:
+    """
+    One object being downloaded as byte ranges into a preallocated .part
+    file. Finished ranges are recorded in a sidecar so a rerun resumes.
+    Empty objects have no ranges: the empty .part file is only verified.
+    """
+
+    def __init__(self, client, entry):
+        self.client = client
+        self.entry = entry
+        self.path = mirror_path(entry['etag'])
+        self.part = self.path + '.part'
+        self.state = self.part + '.json'
+        self.n_parts = -(-entry['size'] // PART_SIZE)
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.done = set()
+        if os.path.exists(self.part) and os.path.exists(self.state):
+            with open(self.state) as f:
+                self.done = set(json.load(f))
+        else:
+            with open(self.part, 'wb') as f:
+                f.truncate(entry['size'])
+
+    def pending(self):
+        return [i for i in range(self.n_parts) if i not in self.done]
+
+    def fetch_part(self, index):
+        start = index * PART_SIZE
+        stop = min(start + PART_SIZE, self.entry['size']) - 1
+        body = self.client.get_object(Bucket=BUCKET_NAME, Key=self.entry['key'],
+                                      Range=f"bytes={start}-{stop}")['Body'].read()
+        if len(body) != stop - start + 1:
+            raise IOError(f"Short read for {self.entry['key']} part {index}.")
+        fd = os.open(self.part, os.O_WRONLY)
+        try:
+            os.pwrite(fd, body, start)
+        finally:
+            os.close(fd)
+        with self.lock:
+            self.done.add(index)
+            tmp = self.state + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(sorted(self.done), f)
+            os.replace(tmp, self.state)
+
+    def _clear_state(self):
+        if os.path.exists(self.state):
+            os.remove(self.state)
+
+    def finish(self):
+        if not verify(self.part, self.entry['size'], self.entry['etag']):
+            os.remove(self.part)
+            self._clear_state()
+            raise IOError(f"Verification failed for {self.entry['key']} (size/ETag mismatch).")
+        os.replace(self.part, self.path)
+        self._clear_state()
+
+def fetch(tiles, products=('MER', 'PHZ'), n_workers=N_WORKERS, endpoint_url=None):
+    """
+    Mirrors the products of a list of tiles.
+
+    All byte ranges of all missing objects share one thread pool, so large
+    pulls are limited by bandwidth rather than by per-file latency. Objects
+    already in the mirror (same ETag) are not downloaded again.
+
+    Returns:
+        dict: (tile, product) -> local path (a readable hard link in RAW_DIR).
+    """
+    entries = resolve(tiles, products, endpoint_url=endpoint_url)
+    client = get_client(endpoint_url, n_workers)
+
+    transfers = {}
+    for entry in entries:
+        if not os.path.exists(mirror_path(entry['etag'])) and entry['etag'] not in transfers:
+            transfers[entry['etag']] = _Transfer(client, entry)
+
+    jobs = [(t, i) for t in transfers.values() for i in t.pending()]
+    if jobs:
+        total = sum(t.entry['size'] for t in transfers.values()) / 1024**2
+        print(f"-> Downloading {len(transfers)} objects ({total:.0f} MB, {len(jobs)} ranges)...")
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            for _ in pool.map(lambda job: job[0].fetch_part(job[1]), jobs):
+                pass
+    for t in transfers.values():
+        t.finish()
+
+    paths = {}
+    for entry in entries:
+        link = os.path.join(RAW_DIR, TILE_NAMES[entry['product']].format(tile=entry['tile']))
+        _link(mirror_path(entry['etag']), link)
+        paths[(entry['tile'], entry['product'])] = link
+    return paths
+
+def fetch_tile(tile, product, endpoint_url=None):
+    """Returns the local path of one tile product, downloading it if needed."""
+    return fetch([tile], (product,), endpoint_url=endpoint_url)[(str(tile), product)]
+
+# --- CATALOGUE READER ---
+
+def _native(values):
+    """FITS (big-endian) column as a native-endian array."""
+    values = np.asarray(values)
+    return values.astype(values.dtype.newbyteorder('='), copy=False)
+
+def read_columns(path, columns, where=None, optional=(), rows=None, hdu=1):
+    """
+    Reads named columns of a FITS table, keeping only rows that pass a range
+    predicate.
+
+    The table is memory-mapped: predicate columns are scanned in chunks of
+    READ_CHUNK_ROWS rows, and the requested columns are then gathered only
+    at the selected rows, so unread columns never leave the disk.
+
+    Args:
+        path (str): FITS file.
+        columns (list): Columns to return (KeyError if missing).
+        where (dict): column -> (lo, hi); rows with lo < value < hi are kept.
+        optional (list): Columns returned only when present.
+        rows (array): Explicit row indices to read instead of a predicate.
+
+    Returns:
+        dict: column -> array, plus 'rows' (selected row indices).
+    """
+    with fits.open(path, memmap=True, lazy_load_hdus=True) as hdul:
+        data = hdul[hdu].data
+        names = set(data.columns.names)
+        n_rows = len(data)
+
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+        elif where:
+            keep = []
+            for start in range(0, n_rows, READ_CHUNK_ROWS):
+                block = data[start:start + READ_CHUNK_ROWS]
+                mask = np.ones(len(block), dtype=bool)
+                for col, (lo, hi) in where.items():
+                    values = block.field(col)
+                    mask &= (values > lo) & (values < hi)
+                keep.append(np.flatnonzero(mask) + start)
+            rows = np.concatenate(keep) if keep else np.zeros(0, dtype=np.int64)
+        else:
+            rows = np.arange(n_rows)
+
+        out = {'rows': rows}
+        for col in list(columns) + [c for c in optional if c in names]:
+            out[col] = _native(data.field(col)[rows])
+    return out
+
+def join_ids(left_ids, right_ids):
+    """
+    Inner join of two integer ID arrays (IDs unique in right_ids) by a
+    sorted-array search.
+
+    Returns:
+        (array, array): Matching indices into left_ids and right_ids.
+    """
+    left_ids, right_ids = np.asarray(left_ids), np.asarray(right_ids)
+    if len(right_ids) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    order = np.argsort(right_ids, kind='stable')
+    sorted_ids = right_ids[order]
+    pos = np.minimum(np.searchsorted(sorted_ids, left_ids), len(sorted_ids) - 1)
+    match = sorted_ids[pos] == left_ids
+    return np.flatnonzero(match), order[pos[match]]
+
+def read_tile(mer_path, phz_path, mer_columns=('RIGHT_ASCENSION', 'DECLINATION'),
+              phz_columns=(Z_COLUMN,), z_range=(3.0, 6.0), optional=()):
+    """
+    Joined MER + PHZ sample of one tile.
+
+    The redshift cut is applied while reading PHZ; MER is read for the ID
+    column first and for the other columns only at the matched rows.
+
+    Args:
+        z_range (tuple): Open interval on Z_COLUMN (None = all rows).
+        optional (list): PHZ columns included when the file has them.
+
+    Returns:
+        dict: column -> array (PHZ rows order), including ID_COLUMN.
+    """
+    where = {Z_COLUMN: z_range} if z_range is not None else None
+    phz = read_columns(phz_path, [ID_COLUMN] + list(phz_columns), where, optional)
+    mer_ids = read_columns(mer_path, [ID_COLUMN])[ID_COLUMN]
+    i_phz, i_mer = join_ids(phz[ID_COLUMN], mer_ids)
+
+    out = {col: values[i_phz] for col, values in phz.items() if col != 'rows'}
+    # Gather MER columns only at matched rows (ascending, for sequential reads)
+    order = np.argsort(i_mer)
+    mer = read_columns(mer_path, mer_columns, rows=i_mer[order])
+    for col in mer_columns:
+        out[col] = np.empty_like(mer[col])
+        out[col][order] = mer[col]
+    return out
+
+def iter_tiles(tiles, endpoint_url=None, **kwargs):
+    """
+    Streams read_tile over tiles. Downloading and reading run as pipeline
+    stages, so the next tiles are fetched and read while the caller works
+    on the current one.
+
+    Yields:
+        (str, dict): Tile ID and its joined sample.
+    """
+    def download(tile):
+        paths = fetch([tile], ('MER', 'PHZ'), endpoint_url=endpoint_url)
+        return str(tile), paths.get((str(tile), 'MER')), paths.get((str(tile), 'PHZ'))
+
+    def read(item):
+        tile, mer, phz = item
+        return tile, (read_tile(mer, phz, **kwargs) if mer and phz else None)
+
+    for tile, sample in pipeline.pipeline(tiles, download, read):
+        if sample is not None:
+            yield tile, sample
+
+def load_tiles(tiles, endpoint_url=None, **kwargs):
+    """
+    Joined, redshift-filtered sample of many tiles (see read_tile), with a
+    'TILE' column. Tiles are read one at a time; only the filtered rows
+    are kept in memory.
+    """
+    parts = []
+    for tile, sample in iter_tiles(tiles, endpoint_url, **kwargs):
+        sample['TILE'] = np.full(len(sample[ID_COLUMN]), int(tile), dtype=np.int64)
+        print(f"-> Tile {tile}: {len(sample[ID_COLUMN])} objects selected.")
+        parts.append(sample)
+    if not parts:
+        return {}
+    # Columns missing from some tiles (optional ones) are dropped
+    common = set.intersection(*(set(p) for p in parts))
+    return {col: np.concatenate([p[col] for p in parts]) for col in parts[0] if col in common}
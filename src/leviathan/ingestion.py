@@ -71,68 +71,92 @@ def get_mock_map(mode='random'):
 import numpy as np
 from astropy.io import fits
 from astropy.cosmology import Planck18
+from scipy.integrate import cumulative_trapezoid
+from functools import lru_cache
 import os
-import gc
+from leviathan import pipeline
+
+# Comoving distance table (Planck18). dz=1e-3 keeps relative errors ~1e-8 at z > 1e-3.
+Z_DISTANCE_MAX = 20.0
+N_DISTANCE = 20001
+
+@lru_cache(maxsize=1)
+def _distance_table():
+    """Tabulates D_c(z) once by cumulative integration of 1/E(z)."""
+    z = np.linspace(0.0, Z_DISTANCE_MAX, N_DISTANCE)
+    hubble_distance = Planck18.hubble_distance.value # Mpc
+    d_c = hubble_distance * cumulative_trapezoid(Planck18.inv_efunc(z), z, initial=0)
+    return z, d_c
+
+def comoving_distance(z):
+    """Returns the comoving distance (Mpc) at redshift z from the cached table."""
+    z_table, d_table = _distance_table()
+    z = np.asarray(z, dtype=float)
+    if np.any(z < 0) or np.any(z > Z_DISTANCE_MAX):
+        raise ValueError(f"Redshift outside the tabulated range [0, {Z_DISTANCE_MAX:g}].")
+    return np.interp(z, z_table, d_table)
+
+def distance_to_redshift(distance):
+    """Inverts the cached D_c(z) table: comoving distance (Mpc) -> redshift."""
+    z_table, d_table = _distance_table()
+    return np.interp(distance, d_table, z_table)
+
+def radec_to_cartesian(ra, dec, z):
+    """
+    Converts sky positions and redshifts to comoving Cartesian coordinates.
+
+    Args:
+        ra, dec (array): Equatorial coordinates in degrees.
+        z (array): Redshifts.
+
+    Returns:
+        array: (N, 3) positions in Mpc.
+    """
+    r = comoving_distance(z)
+    phi = np.radians(ra)
+    theta = np.radians(90.0 - np.asarray(dec, dtype=float))
+    sin_theta = np.sin(theta)
+    return np.column_stack((r * sin_theta * np.cos(phi),
+                            r * sin_theta * np.sin(phi),
+                            r * np.cos(theta)))
 
 def load_quasars(filepath):
     """
     Ingests DESI DR1 'zpix' Catalog (11GB) safely.
     Filters for SPECTYPE='QSO' to reduce memory footprint.
+
+    The table is streamed in row blocks; the next block is read on a
+    background thread while the current one is filtered.
     """
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"Catalog not found: {filepath}")
     
     print(f"Loading DESI Catalog (Memmap): {filepath}...")
     
-    # Open in Memmap mode so we don't crash RAM
     with fits.open(filepath, memmap=True) as hdul:
-        data = hdul[1].data
-        cols = data.columns.names
-        
-        # 1. Identify Quasars
-        print("-> Scanning SPECTYPE column...")
-        spectypes = data['SPECTYPE']
-        
-        # Handle string vs bytes automatically
-        try:
-            is_qso = (spectypes == 'QSO')
-        except FutureWarning:
-            # If numpy complains about string comparison
-            is_qso = (np.char.strip(spectypes) == 'QSO')
-
-        # Check for ZWARN (use 'ZWARN' or 'ZWARN_RR')
-        warn_key = 'ZWARN' if 'ZWARN' in cols else 'ZWARN_RR'
-        
-        # Create mask: Must be a Quasar, No warnings, and Z > 0
-        is_good = (data[warn_key] == 0) & (data['Z'] > 0)
-        mask = is_qso & is_good
-        
-        count = np.sum(mask)
-        print(f"-> Found {count} verified Quasars (filtering out stars/galaxies).")
-        
-        # 2. Load ONLY the target rows
-        ra_key  = 'TARGET_RA' if 'TARGET_RA' in cols else 'RA'
-        dec_key = 'TARGET_DEC' if 'TARGET_DEC' in cols else 'DEC'
-        
-        ra = data[ra_key][mask]
-        dec = data[dec_key][mask]
-        z = data['Z'][mask]
-        
-        # Cleanup memory immediately
-        del spectypes, is_qso, is_good, mask
-        gc.collect()
+        cols = hdul[1].columns.names
+
+    # Check for ZWARN (use 'ZWARN' or 'ZWARN_RR')
+    warn_key = 'ZWARN' if 'ZWARN' in cols else 'ZWARN_RR'
+    ra_key  = 'TARGET_RA' if 'TARGET_RA' in cols else 'RA'
+    dec_key = 'TARGET_DEC' if 'TARGET_DEC' in cols else 'DEC'
+
+    def select(block):
+        # 1. Identify Quasars (string or bytes SPECTYPE, padded or not)
+        spectypes = np.char.strip(block['SPECTYPE'].astype(str))
+        # Must be a Quasar, No warnings, and Z > 0
+        mask = (spectypes == 'QSO') & (block[warn_key] == 0) & (block['Z'] > 0)
+        # 2. Keep ONLY the target rows
+        return block[ra_key][mask], block[dec_key][mask], block['Z'][mask]
+
+    print("-> Scanning SPECTYPE column...")
+    blocks = pipeline.row_blocks(filepath, ['SPECTYPE', warn_key, 'Z', ra_key, dec_key])
+    parts = list(pipeline.pipeline(blocks, select))
+    ra, dec, z = (np.concatenate([p[i] for p in parts]) for i in range(3))
+    print(f"-> Found {len(z)} verified Quasars (filtering out stars/galaxies).")
 
     print("-> Converting to Comoving 3D Coordinates (Planck18)...")
     
     # 3. Spherical -> Cartesian
-    r = Planck18.comoving_distance(z).value # Mpc
-    
-    phi = np.radians(ra)
-    theta = np.radians(90.0 - dec)
-    
-    x = r * np.sin(theta) * np.cos(phi)
-    y = r * np.sin(theta) * np.sin(phi)
-    z_coord = r * np.cos(theta)
-    
-    positions = np.column_stack((x, y, z_coord))
+    positions = radec_to_cartesian(ra, dec, z)
     return positions, z
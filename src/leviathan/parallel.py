@@ -0,0 +1,45 @@
+"""
+Parallel Execution Helpers
+Process-pool mapping with deterministic per-task seeds, shared by the
+null-ensemble, injection and mock-generation engines.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+def default_workers():
+    """Returns the number of worker processes to use by default."""
+    return os.cpu_count() or 1
+
+def spawn_seeds(seed, n):
+    """
+    Returns n independent child seeds (SeedSequence) derived from one seed.
+    Task i always receives the same stream, whatever the worker count.
+    """
+    return np.random.SeedSequence(seed).spawn(n)
+
+def map_tasks(func, tasks, n_workers=None, initializer=None, initargs=(), chunksize=1):
+    """
+    Yields func(task) for every task, in order.
+
+    Args:
+        func (callable): Module-level (picklable) function of one argument.
+        tasks (iterable): Task arguments.
+        n_workers (int): Worker processes (default: all cores). With 1 worker
+            everything runs in this process, without pickling.
+        initializer (callable): Called once per worker with initargs, e.g. to
+            build a KD-tree or load a catalogue into worker-global state.
+        chunksize (int): Tasks sent to a worker per round trip.
+    """
+    n_workers = n_workers or default_workers()
+    if n_workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for task in tasks:
+            yield func(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=initializer,
+                             initargs=initargs) as pool:
+        yield from pool.map(func, tasks, chunksize=chunksize)
@@ -0,0 +1,127 @@
+"""
+Pipelined Ingestion
+Overlaps I/O with computation: each stage of a tile / row-block pipeline
+runs on background threads and hands its results downstream through a
+bounded queue, so the next tile is being downloaded or read while the
+current one is filtered, converted and clustered. Queue bounds give
+backpressure (a fast reader never runs more than `depth` items ahead).
+
+Threads suit these stages because file and network reads, FITS decoding
+and most NumPy kernels release the GIL.
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from astropy.io import fits
+
+# Items buffered between two stages
+PREFETCH_DEPTH = 2
+
+# Rows per block when streaming a FITS table
+BLOCK_ROWS = 1_000_000
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+def _put(q, item, stop):
+    """Blocking put that gives up once the consumer has gone away."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def prefetch(iterable, depth=PREFETCH_DEPTH):
+    """
+    Iterates an iterable on a background thread, up to depth items ahead.
+
+    Exceptions raised by the iterable are re-raised in the consumer; closing
+    the generator early stops the producer.
+
+    Yields:
+        The items of iterable, in order.
+    """
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(q, item, stop):
+                    return
+            _put(q, _DONE, stop)
+        except BaseException as exc:
+            _put(q, _Failure(exc), stop)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+def map_stage(func, iterable, n_threads=1, depth=PREFETCH_DEPTH):
+    """
+    Applies func to a stream on n_threads threads, keeping order and at
+    most n_threads + depth items in flight.
+
+    Yields:
+        func(item) for each item, in input order.
+    """
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        pending = deque()
+        for item in iterable:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= n_threads + depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def pipeline(source, *stages, depth=PREFETCH_DEPTH):
+    """
+    Chains stages over a source with bounded queues between them.
+
+    Args:
+        source (iterable): Items to process (e.g. tile IDs, row blocks).
+        stages: Callables, or (callable, n_threads) tuples, applied in turn.
+        depth (int): Items buffered between consecutive stages.
+
+    Yields:
+        Outputs of the last stage, in source order, computed ahead of the
+        consumer so its own work overlaps with all upstream stages.
+    """
+    stream = prefetch(source, depth)
+    for stage in stages:
+        func, n_threads = stage if isinstance(stage, tuple) else (stage, 1)
+        stream = prefetch(map_stage(func, stream, n_threads, depth), depth)
+    return stream
+
+def row_blocks(path, columns, block_rows=BLOCK_ROWS, hdu=1):
+    """
+    Streams named columns of a FITS table in row blocks (memory-mapped).
+
+    Yields:
+        dict: column -> native-endian array for each block of rows.
+    """
+    with fits.open(path, memmap=True) as hdul:
+        data = hdul[hdu].data
+        for start in range(0, len(data), block_rows):
+            block = data[start:start + block_rows]
+            out = {}
+            for col in columns:
+                values = np.asarray(block.field(col))
+                out[col] = values.astype(values.dtype.newbyteorder('='))
+            yield out
@@ -0,0 +1,283 @@
+"""
+Partitioned Catalogue Store
+Catalogues split by HEALPix pixel (NESTED, order k) and redshift bin and
+stored column-wise under data/processed/store/<name>/.
+
+Each ingested chunk is sorted by partition and written as one .npy file
+per column (columns written in parallel); a small JSON index records the
+row range of every partition in every chunk. Cone, disc, polygon and
+redshift-shell queries memory-map the column files and touch only the row
+ranges of the partitions they intersect, then apply the exact cut.
+"""
+
+import os
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import healpy as hp
+from astropy.io import fits
+
+STORE_DIR = 'data/processed/store'
+
+# Partition order (NSIDE = 2^order; order 4 -> 3072 pixels of ~13 deg^2)
+ORDER = 4
+
+# Redshift bin edges (first and last bins are open-ended)
+Z_EDGES = np.array([0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0, 7.0])
+
+# Threads writing column files
+N_WRITERS = 8
+
+# Rows per chunk when ingesting from FITS
+INGEST_CHUNK_ROWS = 2_000_000
+
+def _unit_vectors(ra, dec):
+    return hp.ang2vec(np.asarray(ra, dtype=float), np.asarray(dec, dtype=float), lonlat=True)
+
+def _in_polygon(vec, vertices):
+    """Points inside a convex spherical polygon (vertices in either order)."""
+    normals = np.cross(vertices, np.roll(vertices, -1, axis=0))
+    # Orient edge normals towards the polygon centre (not its antipode)
+    normals *= np.sign(normals @ vertices.mean(axis=0))[:, None]
+    return np.all(vec @ normals.T >= 0, axis=1)
+
+class CatalogueStore:
+    """
+    One partitioned catalogue (see module docstring).
+    """
+
+    def __init__(self, name, root=STORE_DIR):
+        """
+        Opens an existing store.
+
+        Args:
+            name (str): Catalogue name (directory under root).
+            root (str): Store root.
+        """
+        self.path = os.path.join(root, name)
+        with open(os.path.join(self.path, 'index.json')) as f:
+            self.index = json.load(f)
+        self.nside = 2**self.index['order']
+        self.z_edges = np.asarray(self.index['z_edges'])
+        self._mapped = {}
+
+    @classmethod
+    def create(cls, name, ra='RA', dec='DEC', z='Z', order=ORDER, z_edges=Z_EDGES,
+               root=STORE_DIR, overwrite=False):
+        """
+        Creates an empty store.
+
+        Args:
+            ra, dec, z (str): Names of the position and redshift columns.
+            order (int): HEALPix order of the sky partitions.
+            z_edges (array): Redshift bin edges.
+            overwrite (bool): Replace an existing store of the same name.
+        """
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            if not overwrite:
+                raise FileExistsError(f"Store already exists: {path}")
+            shutil.rmtree(path)
+        os.makedirs(path)
+        index = {'order': order, 'z_edges': list(map(float, z_edges)),
+                 'ra': ra, 'dec': dec, 'z': z,
+                 'columns': {}, 'n_chunks': 0, 'partitions': {}}
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump(index, f)
+        return cls(name, root)
+
+    # --- WRITING ---
+
+    def _save_index(self):
+        tmp = os.path.join(self.path, 'index.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.path, 'index.json'))
+
+    def z_bin(self, z):
+        """Redshift bin of each value (outer bins catch everything beyond)."""
+        n_bins = len(self.z_edges) - 1
+        return np.clip(np.searchsorted(self.z_edges[1:-1], z, side='right'), 0, n_bins - 1)
+
+    def append(self, columns, n_workers=N_WRITERS):
+        """
+        Adds a chunk of rows.
+
+        Args:
+            columns (dict): column -> array (same length; must include the
+                ra / dec / z columns). Every chunk must have the same columns.
+
+        Returns:
+            int: Number of partitions written.
+        """
+        columns = {c: np.asarray(v) for c, v in columns.items()}
+        schema = {c: [v.dtype.str, list(v.shape[1:])] for c, v in columns.items()}
+        if self.index['columns'] and schema != self.index['columns']:
+            raise ValueError("Chunk columns/dtypes differ from the store schema.")
+
+        pix = hp.ang2pix(self.nside, columns[self.index['ra']], columns[self.index['dec']],
+                         nest=True, lonlat=True)
+        key = pix.astype(np.int64) * (len(self.z_edges) - 1) + self.z_bin(columns[self.index['z']])
+        order = np.argsort(key, kind='stable')
+        keys, starts = np.unique(key[order], return_index=True)
+        stops = np.r_[starts[1:], len(order)]
+
+        chunk = self.index['n_chunks']
+        n_bins = len(self.z_edges) - 1
+        chunk_dir = os.path.join(self.path, f"c{chunk:04d}")
+        os.makedirs(chunk_dir, exist_ok=True)
+
+        def write(col):
+            np.save(os.path.join(chunk_dir, f"{col}.npy"), columns[col][order])
+
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            list(pool.map(write, columns))
+
+        for k, start, stop in zip(keys, starts, stops):
+            part = f"p{k // n_bins:06d}_z{k % n_bins:02d}"
+            self.index['partitions'].setdefault(part, {})[str(chunk)] = [int(start), int(stop)]
+        self.index['columns'] = schema
+        self.index['n_chunks'] = chunk + 1
+        self._save_index()
+        return len(keys)
+
+    @classmethod
+    def from_fits(cls, path, name, columns, ra='RA', dec='DEC', z='Z', hdu=1, where=None,
+                  order=ORDER, z_edges=Z_EDGES, root=STORE_DIR, overwrite=False):
+        """
+        Ingests named columns of a FITS table in row chunks (memory-mapped,
+        so catalogues larger than memory are fine).
+
+        Args:
+            columns (list): Columns to store (ra/dec/z are added).
+            where (callable): Optional chunk -> boolean row mask (e.g. a
+                SPECTYPE / ZWARN selection).
+        """
+        store = cls.create(name, ra, dec, z, order, z_edges, root, overwrite)
+        columns = list(dict.fromkeys([ra, dec, z] + list(columns)))
+        with fits.open(path, memmap=True) as hdul:
+            data = hdul[hdu].data
+            n_rows = len(data)
+            print(f"-> Partitioning {n_rows} rows of {path} into '{name}'...")
+            for start in range(0, n_rows, INGEST_CHUNK_ROWS):
+                block = data[start:start + INGEST_CHUNK_ROWS]
+                keep = where(block) if where is not None else slice(None)
+                chunk = {}
+                for col in columns:
+                    values = np.asarray(block.field(col)[keep])
+                    chunk[col] = values.astype(values.dtype.newbyteorder('='), copy=False)
+                store.append(chunk)
+        print(f"-> Stored {store.n_rows} rows in {len(store.index['partitions'])} partitions.")
+        return store
+
+    # --- READING ---
+
+    @property
+    def n_rows(self):
+        return sum(stop - start for chunks in self.index['partitions'].values()
+                   for start, stop in chunks.values())
+
+    @property
+    def columns(self):
+        return list(self.index['columns'])
+
+    def partitions(self, pixels=None, z_range=None):
+        """
+        Stored partitions intersecting a pixel set (NESTED, store order) and
+        a redshift range.
+        """
+        n_bins = len(self.z_edges) - 1
+        bins = None
+        if z_range is not None:
+            lo, hi = self.z_bin(z_range[0]), self.z_bin(z_range[1])
+            bins = set(range(int(lo), int(hi) + 1))
+        pixels = None if pixels is None else set(int(p) for p in pixels)
+        out = []
+        for part in sorted(self.index['partitions']):
+            pix, zb = int(part[1:7]), int(part[9:])
+            if (pixels is None or pix in pixels) and (bins is None or zb in bins) and zb < n_bins:
+                out.append(part)
+        return out
+
+    def _column(self, chunk, col):
+        """Memory-mapped column file of one chunk (opened once)."""
+        key = (chunk, col)
+        if key not in self._mapped:
+            path = os.path.join(self.path, f"c{int(chunk):04d}", f"{col}.npy")
+            self._mapped[key] = np.load(path, mmap_mode='r')
+        return self._mapped[key]
+
+    def _load(self, part, col):
+        chunks = self.index['partitions'][part]
+        ranges = sorted(chunks.items(), key=lambda kv: int(kv[0]))
+        arrays = [self._column(c, col)[start:stop] for c, (start, stop) in ranges]
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    def read(self, parts, columns=None, select=None):
+        """
+        Rows of the given partitions passing an exact cut.
+
+        Args:
+            parts (list): Partition names (from partitions()).
+            columns (list): Columns to return (default: all).
+            select (callable): (ra, dec, z) -> boolean row mask.
+
+        Returns:
+            dict: column -> array.
+        """
+        columns = self.columns if columns is None else list(columns)
+        pos_cols = (self.index['ra'], self.index['dec'], self.index['z'])
+        out = {col: [] for col in columns}
+        for part in parts:
+            keep = slice(None)
+            if select is not None:
+                keep = select(*(self._load(part, c) for c in pos_cols))
+            for col in columns:
+                out[col].append(np.asarray(self._load(part, col)[keep]))
+        return {col: self._concat(col, arrays) for col, arrays in out.items()}
+
+    def _concat(self, col, arrays):
+        if arrays:
+            return np.concatenate(arrays)
+        dtype, shape = self.index['columns'][col]
+        return np.zeros([0] + shape, dtype=np.dtype(dtype))
+
+    @staticmethod
+    def _z_mask(z, z_range):
+        return np.ones(len(z), dtype=bool) if z_range is None else (z >= z_range[0]) & (z < z_range[1])
+
+    def disc(self, vec, radius, z_range=None, columns=None):
+        """
+        Rows within radius (radians) of a unit vector (healpy convention),
+        optionally in z_range = [z_min, z_max).
+        """
+        vec = np.asarray(vec, dtype=float) / np.linalg.norm(vec)
+        pixels = hp.query_disc(self.nside, vec, radius, inclusive=True, nest=True)
+        cos_r = np.cos(radius)
+
+        def select(ra, dec, z):
+            return (_unit_vectors(ra, dec) @ vec >= cos_r) & self._z_mask(z, z_range)
+        return self.read(self.partitions(pixels, z_range), columns, select)
+
+    def cone(self, ra, dec, radius_deg, z_range=None, columns=None):
+        """Rows within radius_deg of (ra, dec) (deg), optionally in z_range."""
+        return self.disc(_unit_vectors(ra, dec), np.radians(radius_deg), z_range, columns)
+
+    def polygon(self, ra, dec, z_range=None, columns=None):
+        """
+        Rows inside a convex sky polygon with vertices (ra, dec) in deg,
+        optionally in z_range.
+        """
+        vertices = _unit_vectors(ra, dec)
+        pixels = hp.query_polygon(self.nside, vertices, inclusive=True, nest=True)
+
+        def select(ra_, dec_, z):
+            return _in_polygon(_unit_vectors(ra_, dec_), vertices) & self._z_mask(z, z_range)
+        return self.read(self.partitions(pixels, z_range), columns, select)
+
+    def shell(self, z_min, z_max, columns=None):
+        """All rows with z_min <= z < z_max."""
+        z_range = (z_min, z_max)
+        return self.read(self.partitions(None, z_range), columns,
+                         lambda ra, dec, z: self._z_mask(z, z_range))
@@ -0,0 +1,188 @@
+"""
+Lognormal Mock Engine
+Generates clustered, quasar-like catalogues (lognormal density fields Poisson
+sampled into the survey light-cone and footprint), so that nulls carry
+LambdaCDM structure instead of pure Poisson noise.
+"""
+
+import os
+import numpy as np
+import healpy as hp
+from scipy import fft
+from leviathan import ingestion, parallel
+from leviathan.engines import halos
+
+# Grid cells exponentiated and Poisson sampled per slab (bounds peak memory)
+SLAB_CELLS = 4_000_000
+
+# Directions drawn from the footprint to bound the light-cone box
+N_BOUND_DIRECTIONS = 200_000
+
+# Worker-global generator (set once per process by _init_worker)
+_WORKER = {}
+
+class LognormalMocks:
+    """
+    Builds the lognormal transfer once (Gaussian-field spectrum on the FFT
+    grid), then draws any number of independent mocks from seeds.
+    """
+
+    def __init__(self, footprint, power=None, bias=2.5, z_eff=None, n_grid=256):
+        """
+        Args:
+            footprint (RandomCatalogue): Supplies the HEALPix mask and the
+                data n(z); mocks reproduce both (and the data count on average).
+            power (callable): Linear matter P(k) at z=0 (k in 1/Mpc, Mpc^3).
+                Defaults to HaloMassFunction().linear_power.
+            bias (float): Linear tracer bias at z_eff.
+            z_eff (float): Redshift of the field amplitude (default: median
+                of the footprint n(z)).
+            n_grid (int): Cells along the longest side of the box.
+        """
+        self.footprint = footprint
+        hmf = halos.HaloMassFunction()
+        power = hmf.linear_power if power is None else power
+
+        # 1. Radial selection nbar(r) from the footprint n(z)
+        z_edges = footprint.z_edges
+        self.r_edges = ingestion.comoving_distance(z_edges)
+        counts = np.diff(footprint.z_cdf) * footprint.n_data
+        shell_volume = footprint.f_sky * 4 * np.pi / 3 * np.diff(self.r_edges**3)
+        self.nbar = counts / shell_volume # Mpc^-3
+        if z_eff is None:
+            z_eff = np.interp(0.5, footprint.z_cdf, z_edges)
+        growth = hmf.growth(z_eff)
+
+        # 2. Box enclosing the light-cone (extremes lie on the r_min / r_max caps)
+        dirs = footprint.sample_directions(N_BOUND_DIRECTIONS)
+        ends = np.concatenate((dirs * self.r_edges[0], dirs * self.r_edges[-1]))
+        pad = self.r_edges[-1] * footprint.max_radius
+        lo, hi = ends.min(axis=0) - pad, ends.max(axis=0) + pad
+        self.cell = np.max(hi - lo) / n_grid
+        self.shape = tuple(int(n) for n in np.ceil((hi - lo) / self.cell))
+        self.origin = lo
+        self.cell_volume = self.cell**3
+
+        # Envelope of nbar over every cell's radial extent (for exact thinning)
+        half = self.cell * np.sqrt(3) / 2
+        lo_bin = np.searchsorted(self.r_edges, self.r_edges[:-1] - half, side='right') - 1
+        hi_bin = np.searchsorted(self.r_edges, self.r_edges[1:] + half, side='left')
+        lo_bin = np.clip(lo_bin, 0, len(self.nbar) - 1)
+        self.nbar_envelope = np.array([self.nbar[a:max(b, a + 1)].max() for a, b in zip(lo_bin, hi_bin)])
+        self.half_diagonal = half
+
+        # 3. Lognormal transfer: xi_LN -> xi_G = ln(1 + xi_LN) -> P_G
+        k_mag = self._k_grid()
+        pk_target = (bias * growth)**2 * power(k_mag).astype(np.float32)
+        pk_target[0, 0, 0] = 0.0
+        xi_ln = fft.irfftn(pk_target, s=self.shape) / self.cell_volume
+        del pk_target
+        xi_g = np.log1p(np.maximum(xi_ln, -0.999))
+        del xi_ln
+        self.sigma2_g = float(xi_g[0, 0, 0])
+        pk_g = fft.rfftn(xi_g).real * self.cell_volume
+        del xi_g
+        self.amplitude = np.sqrt(np.maximum(pk_g, 0.0) / self.cell_volume).astype(np.float32)
+
+    def _k_grid(self):
+        """|k| (1/Mpc) on the real-FFT grid."""
+        kx = 2 * np.pi * np.fft.fftfreq(self.shape[0], d=self.cell).astype(np.float32)
+        ky = 2 * np.pi * np.fft.fftfreq(self.shape[1], d=self.cell).astype(np.float32)
+        kz = 2 * np.pi * np.fft.rfftfreq(self.shape[2], d=self.cell).astype(np.float32)
+        return np.sqrt(kx[:, None, None]**2 + ky[None, :, None]**2 + kz[None, None, :]**2)
+
+    def _nbar_at(self, r):
+        idx = np.searchsorted(self.r_edges, r, side='right') - 1
+        inside = (idx >= 0) & (idx < len(self.nbar))
+        return np.where(inside, self.nbar[np.clip(idx, 0, len(self.nbar) - 1)], 0.0)
+
+    def _envelope_at(self, r):
+        """Upper bound of nbar within half a cell diagonal of radius r."""
+        idx = np.clip(np.searchsorted(self.r_edges, r, side='right') - 1, 0, len(self.nbar) - 1)
+        near = (r > self.r_edges[0] - self.half_diagonal) & (r < self.r_edges[-1] + self.half_diagonal)
+        return np.where(near, self.nbar_envelope[idx], 0.0)
+
+    def generate(self, seed=None):
+        """
+        Draws one mock catalogue.
+
+        Returns:
+            (array, array): (N, 3) comoving positions (Mpc) and redshifts,
+            matching the output of ingestion.load_quasars.
+        """
+        rng = np.random.default_rng(seed)
+
+        # 1. Gaussian field with the transformed spectrum (real FFTs)
+        field_k = fft.rfftn(rng.standard_normal(self.shape, dtype=np.float32))
+        field_k *= self.amplitude
+        field = fft.irfftn(field_k, s=self.shape)
+        del field_k
+
+        # 2. Exponentiate and Poisson sample slab by slab
+        nx, ny, nz = self.shape
+        y_c = self.origin[1] + (np.arange(ny) + 0.5) * self.cell
+        z_c = self.origin[2] + (np.arange(nz) + 0.5) * self.cell
+        slab = max(1, SLAB_CELLS // (ny * nz))
+        chunks = [(np.empty((0, 3)), np.empty(0))]
+        for x0 in range(0, nx, slab):
+            x_c = self.origin[0] + (np.arange(x0, min(x0 + slab, nx)) + 0.5) * self.cell
+            r = np.sqrt(x_c[:, None, None]**2 + y_c[None, :, None]**2 + z_c[None, None, :]**2)
+            envelope = self._envelope_at(r)
+            density = np.exp(field[x0:x0 + slab] - 0.5 * self.sigma2_g) # 1 + delta
+            counts = rng.poisson(envelope * self.cell_volume * density).ravel()
+
+            cells = np.repeat(np.flatnonzero(counts), counts[counts > 0])
+            ijk = np.column_stack(np.unravel_index(cells, r.shape))
+            ijk[:, 0] += x0
+            points = self.origin + (ijk + rng.random(ijk.shape)) * self.cell
+
+            # Thin from the cell envelope to nbar at each object's own radius
+            r_pts = np.linalg.norm(points, axis=1)
+            keep = rng.random(len(points)) * envelope.ravel()[cells] < self._nbar_at(r_pts)
+            chunks.append((points[keep], r_pts[keep]))
+
+        positions = np.concatenate([c[0] for c in chunks])
+        r = np.concatenate([c[1] for c in chunks])
+
+        # 3. Footprint selection per object
+        pix = hp.vec2pix(self.footprint.nside, positions[:, 0], positions[:, 1], positions[:, 2])
+        keep = rng.random(len(pix)) < self.footprint.mask[pix]
+        positions, r = positions[keep], r[keep]
+        return positions, ingestion.distance_to_redshift(r)
+
+    def iter_mocks(self, n_mocks, seed=None, n_workers=None):
+        """
+        Generates n_mocks independent mocks in parallel worker processes.
+
+        Yields:
+            (int, array, array): Mock index, positions and redshifts, in order.
+            Mock i depends only on (seed, i), not on the worker count.
+        """
+        seeds = parallel.spawn_seeds(seed, n_mocks)
+        results = parallel.map_tasks(_generate_task, seeds, n_workers=n_workers,
+                                     initializer=_init_worker, initargs=(self,))
+        for i, (positions, z) in enumerate(results):
+            yield i, positions, z
+
+    def write_ensemble(self, n_mocks, out_dir, seed=None, n_workers=None):
+        """
+        Writes mocks to out_dir/mock_XXXX.npz, skipping files that already
+        exist so an interrupted ensemble resumes where it stopped.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        seeds = parallel.spawn_seeds(seed, n_mocks)
+        paths = [os.path.join(out_dir, f"mock_{i:04d}.npz") for i in range(n_mocks)]
+        todo = [i for i, path in enumerate(paths) if not os.path.exists(path)]
+        print(f"-> Generating {len(todo)} of {n_mocks} lognormal mocks (grid {self.shape})...")
+
+        results = parallel.map_tasks(_generate_task, [seeds[i] for i in todo], n_workers=n_workers,
+                                     initializer=_init_worker, initargs=(self,))
+        for i, (positions, z) in zip(todo, results):
+            np.savez(paths[i], positions=positions, z=z)
+        return paths
+
+def _init_worker(mocks):
+    _WORKER['mocks'] = mocks
+
+def _generate_task(seed):
+    return _WORKER['mocks'].generate(seed)
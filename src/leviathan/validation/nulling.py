@@ -60,24 +60,27 @@ class NullGenerator:
 
 import numpy as np
 import healpy as hp
+from leviathan.validation import pseudo_cl
 
-def generate_masked_null(real_map, mask, lmax=512):
+def generate_masked_null(real_map, mask, lmax=512, cls=None):
     """
     Generates a Gaussian Random Field (GRF) constrained by the 
     power spectrum of the real map and the physical mask.
+
+    Args:
+        cls (array): Full-sky C_l of the real map. Pass it when drawing many
+            nulls so the spectrum is estimated only once.
     """
     nside = hp.get_nside(real_map)
     
-    # 1. Extract the Power Spectrum (Cl) from the real map
-    # We use the masked map to get the observed power
-    cls = hp.anafast(real_map * mask, lmax=lmax)
-    
-    # 2. Correct for the mask bias (f_sky)
-    f_sky = np.mean(mask)
-    cls_corrected = cls / f_sky
+    # 1. Extract the mask-deconvolved (MASTER) power spectrum of the real map
+    #    (the coupling matrix is cached per mask and lmax)
+    if cls is None:
+        cls = pseudo_cl.PseudoCl.for_mask(mask, lmax).spectrum(real_map)
+    cls_corrected = np.maximum(cls, 0.0)
     
-    # 3. Synthesize a new random sky from those Cls
+    # 2. Synthesize a new random sky from those Cls
     null_map = hp.synfast(cls_corrected, nside, lmax=lmax, verbose=False)
     
-    # 4. Apply the SAME mask to the null map
+    # 3. Apply the SAME mask to the null map
     return null_map * mask
@@ -0,0 +1,142 @@
+"""
+Random Catalogue Engine
+Generates unclustered catalogues that preserve the survey footprint (HEALPix
+mask) and the radial selection n(z) of the data, for FoF and pair-count nulls.
+"""
+
+import numpy as np
+import healpy as hp
+from leviathan import config, ingestion
+
+# Number of redshift bins used to tabulate the n(z) inverse CDF
+N_Z_BINS = 1000
+
+class RandomCatalogue:
+    """
+    Samples RA/Dec uniformly inside a footprint and z from the data n(z).
+    """
+
+    def __init__(self, z_data, mask=None, ra=None, dec=None, nside=None, seed=None):
+        """
+        Args:
+            z_data (array): Redshifts of the data catalogue (defines n(z)).
+            mask (array): HEALPix footprint (RING ordering, weights in [0, 1]).
+                If None, the footprint is the set of pixels occupied by the
+                data (ra, dec) at `nside`.
+            ra, dec (array): Data coordinates in degrees (needed without mask).
+            nside (int): Footprint resolution when built from data
+                (default config.NSIDE).
+            seed (int): Optional seed for reproducibility.
+        """
+        self.rng = np.random.default_rng(seed)
+
+        if mask is None:
+            if ra is None or dec is None:
+                raise ValueError("Provide either a footprint mask or the data ra/dec.")
+            nside = nside or config.NSIDE
+            pix = hp.ang2pix(nside, np.asarray(ra), np.asarray(dec), lonlat=True)
+            mask = (np.bincount(pix, minlength=hp.nside2npix(nside)) > 0).astype(float)
+        self.mask = np.asarray(mask, dtype=float)
+        self.nside = hp.get_nside(self.mask)
+
+        # 1. Footprint: pixel-weighted selection table
+        self.pixels = np.flatnonzero(self.mask > 0)
+        cum = np.cumsum(self.mask[self.pixels])
+        self.pixel_cdf = cum / cum[-1]
+        self.max_radius = hp.max_pixrad(self.nside)
+        self.f_sky = np.sum(self.mask) / len(self.mask)
+
+        # 2. Radial selection: piecewise-uniform n(z) inverse CDF
+        z_data = np.asarray(z_data, dtype=float)
+        counts, self.z_edges = np.histogram(z_data, bins=N_Z_BINS)
+        self.z_cdf = np.concatenate(([0.0], np.cumsum(counts) / len(z_data)))
+        self.n_data = len(z_data)
+
+    @classmethod
+    def from_positions(cls, positions, z, nside=None, seed=None):
+        """Builds the generator from (N, 3) comoving positions and redshifts."""
+        theta, phi = hp.vec2ang(np.asarray(positions))
+        nside = nside or config.NSIDE
+        pix = hp.ang2pix(nside, theta, phi)
+        mask = (np.bincount(pix, minlength=hp.nside2npix(nside)) > 0).astype(float)
+        return cls(z, mask=mask, seed=seed)
+
+    def sample_directions(self, n):
+        """
+        Returns (n, 3) unit vectors distributed uniformly inside the footprint.
+
+        Pixels are drawn with probability proportional to their mask weight;
+        each point is then placed uniformly within its pixel by rejection
+        from the bounding cap of radius max_pixrad.
+        """
+        pix = self.pixels[np.searchsorted(self.pixel_cdf, self.rng.random(n), side='right')]
+        centres = np.column_stack(hp.pix2vec(self.nside, pix))
+
+        # Orthonormal frame around each centre (reference axis avoids the poles)
+        ref = np.zeros_like(centres)
+        ref[:, 2] = 1.0
+        near_pole = np.abs(centres[:, 2]) > 0.9
+        ref[near_pole] = (1.0, 0.0, 0.0)
+        e1 = np.cross(centres, ref)
+        e1 /= np.linalg.norm(e1, axis=1)[:, None]
+        e2 = np.cross(centres, e1)
+
+        out = np.empty_like(centres)
+        todo = np.arange(n)
+        cos_max = np.cos(self.max_radius)
+        while len(todo):
+            m = len(todo)
+            cos_t = 1.0 - self.rng.random(m) * (1.0 - cos_max)
+            sin_t = np.sqrt(1.0 - cos_t**2)
+            phi = 2 * np.pi * self.rng.random(m)
+            v = (cos_t[:, None] * centres[todo]
+                 + (sin_t * np.cos(phi))[:, None] * e1[todo]
+                 + (sin_t * np.sin(phi))[:, None] * e2[todo])
+            hit = hp.vec2pix(self.nside, v[:, 0], v[:, 1], v[:, 2]) == pix[todo]
+            out[todo[hit]] = v[hit]
+            todo = todo[~hit]
+        return out
+
+    def sample_redshifts(self, n):
+        """Returns n redshifts drawn from the data n(z) by inverse CDF."""
+        return np.interp(self.rng.random(n), self.z_cdf, self.z_edges)
+
+    def sample(self, n):
+        """
+        Returns one random catalogue of n objects.
+
+        Returns:
+            (array, array): (n, 3) comoving positions (Mpc) and redshifts,
+            matching the output of ingestion.load_quasars.
+        """
+        z = self.sample_redshifts(n)
+        positions = self.sample_directions(n) * ingestion.comoving_distance(z)[:, None]
+        return positions, z
+
+    def iter_chunks(self, multiple=1.0, chunk_size=1_000_000):
+        """
+        Streams a random catalogue of multiple * n_data objects in chunks.
+
+        Yields:
+            (array, array): Positions and redshifts of each chunk.
+        """
+        remaining = int(round(multiple * self.n_data))
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            yield self.sample(n)
+            remaining -= n
+
+    def draw(self, seed=None, multiple=1.0):
+        """
+        Returns one full catalogue from a fresh seed. Picklable as a bound
+        method, so it can serve as the null factory of a worker pool.
+        """
+        self.rng = np.random.default_rng(seed)
+        return self.generate(multiple)
+
+    def generate(self, multiple=1.0, chunk_size=1_000_000):
+        """Returns the full catalogue of multiple * n_data objects at once."""
+        chunks = list(self.iter_chunks(multiple, chunk_size))
+        if not chunks:
+            return np.empty((0, 3)), np.empty(0)
+        return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])